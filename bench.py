@@ -0,0 +1,235 @@
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from synth import *
+from interfaces import *
+from symantic import *
+from tac import generate_tac, run_tac
+
+
+# ============================================================================
+# ГЕНЕРАТОР СИНТЕТИЧЕСКИХ ПРОГРАММ
+# ============================================================================
+
+def generate_expression(rng: random.Random, names: list[str], depth: int) -> str:
+    """
+    Случайное арифметическое выражение глубины depth над переменными names
+
+    Правые поддеревья неглубокие, чтобы размер выражения рос линейно по depth
+    """
+    if depth <= 0 or not names:
+        if names and rng.random() < 0.6:
+            return rng.choice(names)
+        return str(rng.randint(1, 9))
+    op = rng.choice(['+', '-', '*'])
+    left = generate_expression(rng, names, depth - 1)
+    if op == '*':
+        # Умножение только на константу - иначе значения растут экспоненциально
+        right = str(rng.randint(1, 9))
+    else:
+        right = generate_expression(rng, names, rng.randint(0, min(depth - 1, 2)))
+    if rng.random() < 0.3:
+        return f'({left} {op} {right})'
+    return f'{left} {op} {right}'
+
+
+def generate_program(
+    declarations: int = 10,
+    depth: int = 3,
+    nesting: int = 1,
+    iterations: int = 10,
+    array_size: int = 10,
+    seed: int = 0,
+) -> str:
+    """
+    Синтетическая программа на языке prog ...; main() { ... }
+
+    Args:
+        declarations: число объявленных скалярных переменных
+        depth: глубина арифметических выражений
+        nesting: глубина вложенности циклов for (0 - без циклов)
+        iterations: число итераций каждого цикла
+        array_size: размер массива, заполняемого во внутреннем цикле
+        seed: зерно генератора случайных чисел
+    """
+    rng = random.Random(seed)
+    ints = [f'v{i}' for i in range(max(declarations, 1))]
+    lines = ['prog Bench;', '']
+    lines += [f'int {name};' for name in ints]
+    lines += ['float acc;', 'bool flag;', f'int arr[{max(array_size, 1)}];', '', 'main() {']
+
+    # Линейный код: каждая переменная вычисляется из уже вычисленных
+    for pos, name in enumerate(ints):
+        lines.append(f'    {name} = {generate_expression(rng, ints[:pos], depth)};')
+    lines.append(f'    flag = {ints[0]} < {ints[-1]} && !({ints[0]} == 0);')
+    lines.append('    acc = 0.0;')
+
+    # Вложенные циклы, во внутреннем - заполнение массива и накопление суммы
+    indent = '    '
+    loop_vars = [f'i{level}' for level in range(nesting)]
+    for var in loop_vars:
+        lines.append(f'{indent}for (int {var} = 0; {var} < {iterations}; {var} = {var} + 1) {{')
+        indent += '    '
+    if loop_vars:
+        index = loop_vars[-1] if iterations <= array_size else '0'
+        lines.append(f'{indent}arr[{index}] = {loop_vars[-1]} * 2 + 1;')
+        lines.append(f'{indent}acc = acc + arr[{index}] / 2;')
+        lines.append(f'{indent}{ints[0]} = {ints[0]} + {loop_vars[0]};')
+    for _ in loop_vars:
+        indent = indent[:-4]
+        lines.append(f'{indent}}}')
+
+    lines += ['}', '']
+    return '\n'.join(lines)
+
+
+# ============================================================================
+# ИЗМЕРЕНИЕ ФАЗ
+# ============================================================================
+
+def measure(func, *args, memory: bool = True):
+    """
+    Время выполнения func(*args) и пиковая память (tracemalloc, отдельным запуском)
+
+    Returns:
+        (результат, секунды, пиковая_память_в_байтах или None)
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        result = func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def rate(count: int, seconds: float) -> float | None:
+    return round(count / seconds, 1) if seconds > 0 else None
+
+
+def run_benchmark(
+    source: str,
+    lexer: str = 'regex',
+    memory: bool = True,
+    compiled: bool = False,
+    tac: bool = False,
+) -> dict:
+    """
+    Раздельный замер лексического анализа, семантического анализа и вывода трассы
+
+    Args:
+        compiled: выражения выполняются замыканиями (closures.py) вместо обхода деревьев
+        tac: дополнительно замерить генерацию трехадресного кода и его выполнение (tac.py)
+    """
+    tokens, synth_seconds, synth_peak = measure(LEXERS[lexer], source, memory=memory)
+    operations, symantic_seconds, symantic_peak = measure(
+        symantic, tokens, Operations, ExecOptions(compiled=compiled), memory=memory
+    )
+    calls, calls_seconds, calls_peak = measure(stack_calls, operations, memory=memory)
+    memory_map, vars_seconds, vars_peak = measure(stack_variables, operations, memory=memory)
+
+    result = {
+        'source_bytes': len(source.encode('utf-8')),
+        'tokens': len(tokens),
+        'operations': len(operations),
+        'phases': {
+            'synth': {
+                'seconds': synth_seconds,
+                'tokens_per_s': rate(len(tokens), synth_seconds),
+                'peak_bytes': synth_peak,
+            },
+            'symantic': {
+                'seconds': symantic_seconds,
+                'ops_per_s': rate(len(operations), symantic_seconds),
+                'peak_bytes': symantic_peak,
+            },
+            'stack_calls': {
+                'seconds': calls_seconds,
+                'ops_per_s': rate(len(operations), calls_seconds),
+                'peak_bytes': calls_peak,
+            },
+            'stack_variables': {
+                'seconds': vars_seconds,
+                'ops_per_s': rate(len(operations), vars_seconds),
+                'peak_bytes': vars_peak,
+            },
+        },
+    }
+    if tac:
+        code, generate_seconds, generate_peak = measure(generate_tac, parse_program(tokens), memory=memory)
+        _, run_seconds, run_peak = measure(run_tac, code, memory=memory)
+        result['quads'] = len(code.code)
+        result['phases']['tac_generate'] = {
+            'seconds': generate_seconds,
+            'quads_per_s': rate(len(code.code), generate_seconds),
+            'peak_bytes': generate_peak,
+        }
+        result['phases']['tac_run'] = {'seconds': run_seconds, 'peak_bytes': run_peak}
+    return result
+
+
+# Набор стандартных конфигураций: по одной нагрузке на каждый параметр генератора
+SUITE = {
+    'declarations': dict(declarations=2000, depth=2, nesting=0),
+    'expressions': dict(declarations=200, depth=40, nesting=0),
+    'nested_loops': dict(declarations=5, depth=2, nesting=3, iterations=20, array_size=20),
+    'long_loop': dict(declarations=5, depth=2, nesting=1, iterations=20000, array_size=20000),
+    'big_array': dict(declarations=5, depth=2, nesting=1, iterations=1000, array_size=1_000_000),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Замер производительности фаз транслятора')
+    parser.add_argument('--case', action='append', choices=sorted(SUITE),
+                        help='конфигурация из набора (по умолчанию - все)')
+    parser.add_argument('--declarations', type=int, help='своя конфигурация: число объявлений')
+    parser.add_argument('--depth', type=int, default=3, help='глубина выражений')
+    parser.add_argument('--nesting', type=int, default=1, help='вложенность циклов')
+    parser.add_argument('--iterations', type=int, default=10, help='итераций на цикл')
+    parser.add_argument('--array-size', type=int, default=10, help='размер массива')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lexer', choices=sorted(LEXERS), default='regex')
+    parser.add_argument('--no-memory', action='store_true', help='не измерять пиковую память')
+    parser.add_argument('--compiled', action='store_true',
+                        help='выражения - замыканиями (closures.py), а не обходом деревьев')
+    parser.add_argument('--tac', action='store_true',
+                        help='замерить также генерацию и выполнение трехадресного кода (tac.py)')
+    args = parser.parse_args(argv)
+
+    if args.declarations is not None:
+        cases = {'custom': dict(
+            declarations=args.declarations,
+            depth=args.depth,
+            nesting=args.nesting,
+            iterations=args.iterations,
+            array_size=args.array_size,
+        )}
+    else:
+        cases = {name: SUITE[name] for name in (args.case or SUITE)}
+
+    results = []
+    for name, params in cases.items():
+        source = generate_program(seed=args.seed, **params)
+        result = run_benchmark(
+            source, lexer=args.lexer, memory=not args.no_memory, compiled=args.compiled, tac=args.tac
+        )
+        results.append({'case': name, 'params': params, 'lexer': args.lexer, 'compiled': args.compiled, **result})
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+
+
+# ============================================================================
+# КЭШ РЕЗУЛЬТАТОВ ТРАНСЛЯЦИИ
+# ============================================================================
+
+# Модули, от которых зависит результат трансляции: их содержимое - версия транслятора
+TRANSLATOR_MODULES = [
+    'data.py',
+    'synth.py',
+    'tree.py',
+    'logic_tree.py',
+    'operations.py',
+    'vectorize.py',
+    'parallel.py',
+    'closures.py',
+    'symantic.py',
+    'optimize.py',
+    'tac.py',
+    'interfaces.py',
+    'pipeline.py',
+]
+
+CACHE_DIR = '.translator_cache'
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_SUFFIX = '.pkl'
+
+
+@functools.cache
+def translator_version() -> str:
+    """Хэш исходного кода транслятора: любая правка модулей сбрасывает кэш"""
+    digest = hashlib.sha256()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for module in TRANSLATOR_MODULES:
+        digest.update(module.encode('utf-8'))
+        with open(os.path.join(base, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(program_text, **options) -> str:
+    """
+    Ключ записи: хэш текста программы, версии транслятора и опций трансляции
+
+    program_text - текст или итератор его частей (файл, читаемый потоком): ключ от разбиения не зависит
+    """
+    digest = hashlib.sha256()
+    digest.update(translator_version().encode('utf-8'))
+    for name, value in sorted(options.items()):
+        digest.update(f'\0{name}={value}'.encode('utf-8'))
+    digest.update(b'\0')
+    for part in [program_text] if isinstance(program_text, str) else program_text:
+        digest.update(part.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """
+    Каталог с результатами трансляции, адресуемыми по ключу cache_key
+
+    Каждая запись - отдельный pickle-файл. Время изменения файла обновляется
+    при каждом чтении, при превышении max_bytes удаляются самые давно
+    использованные записи (LRU).
+    """
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> dict | None:
+        """Запись по ключу или None, если ее нет или она повреждена"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Поврежденная запись (например, оборванная запись на диск) - промах
+            self.remove(path)
+            return None
+        os.utime(path)
+        return entry
+
+    def put(self, key: str, entry: dict):
+        """Атомарная запись через временный файл с последующим вытеснением"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            self.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Удаление самых давно использованных записей сверх max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not item.name.endswith(CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(CACHE_SUFFIX):
+                self.remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,167 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline import *
+from utils import stream_sink
+
+
+# ============================================================================
+# ПАКЕТНАЯ ТРАНСЛЯЦИЯ БЕЗ GUI
+# ============================================================================
+
+def expand_sources(patterns: list[str]) -> list[str]:
+    """Файлы по путям и шаблонам (**, *, ?) без повторов, в порядке перечисления"""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if any(char in pattern for char in '*?[') else [pattern]
+        paths += [path for path in matches if not os.path.isdir(path)]
+    return list(dict.fromkeys(paths))
+
+
+def source_root(paths: list[str]) -> str:
+    """Общий каталог всех источников"""
+    return os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+
+
+def output_base(path: str, out_dir: str, root: str) -> str:
+    """Путь результатов без расширения: структура каталогов источника относительно root внутри out_dir"""
+    relative = os.path.relpath(os.path.abspath(path), root)
+    return os.path.join(out_dir, os.path.splitext(relative)[0])
+
+
+def output_collisions(paths: list[str], out_dir: str, root: str) -> dict[str, list[str]]:
+    """Источники с одинаковым путем результатов (например, prog.txt и prog.c): {путь: [источники]}"""
+    sources = {}
+    for path in paths:
+        sources.setdefault(os.path.normcase(output_base(path, out_dir, root)), []).append(path)
+    return {base: group for base, group in sources.items() if len(group) > 1}
+
+
+def translate_file(path: str, out_dir: str, root: str, settings: dict) -> dict:
+    """
+    Трансляция одного файла в процессе пула
+
+    Пишет <имя>.calls.txt (стек вызовов), <имя>.memory.txt (распределение памяти)
+    и, если settings['tac'], <имя>.tac.txt (трехадресный код).
+
+    Returns:
+        {'path', 'ok', 'error', 'tokens', 'operations', 'timings'}
+    """
+    summary = {'path': path, 'ok': False, 'error': None, 'tokens': 0, 'operations': 0, 'timings': {}}
+    try:
+        result = translate(
+            lexer=settings['lexer'],
+            path=path,
+            fold=settings['fold'],
+            reuse_temps=settings['reuse_temps'],
+            options=ExecOptions(compiled=settings['compiled']),
+            tac=settings['tac'],
+        )
+        base = output_base(path, out_dir, root)
+        os.makedirs(os.path.dirname(base) or '.', exist_ok=True)
+        with open(base + '.calls.txt', 'w', encoding='utf-8') as f:
+            f.write(result['stack_calls'])
+        with open(base + '.memory.txt', 'w', encoding='utf-8') as f:
+            f.write(result['stack_variables'])
+        if result['tac'] is not None:
+            with open(base + '.tac.txt', 'w', encoding='utf-8') as f:
+                f.write(result['tac'])
+    except Exception as e:
+        summary['error'] = f'{type(e).__name__}: {e}'
+        return summary
+
+    summary.update(
+        ok=True,
+        tokens=len(result['tokens']),
+        operations=result['operations_count'],
+        timings=result['timings'],
+    )
+    return summary
+
+
+def total_timings(summaries: list[dict]) -> dict:
+    """Сумма времени фаз по всем файлам"""
+    totals = {}
+    for summary in summaries:
+        for phase, timing in summary['timings'].items():
+            total = totals.setdefault(phase, {'wall': 0.0, 'cpu': 0.0})
+            total['wall'] += timing['wall']
+            total['cpu'] += timing['cpu']
+    return totals
+
+
+def main(argv=None) -> int:
+    """
+    Пакетная трансляция; параметры по умолчанию - как в GUI (main.py): лексер regex,
+    свертка констант, переиспользование временных $N и выражения замыканиями включены,
+    поэтому результаты совпадают с тем, что показывает окно
+    """
+    parser = argparse.ArgumentParser(description='Пакетная трансляция программ без GUI')
+    parser.add_argument('sources', nargs='+', help='файлы или шаблоны (например, "students/**/*.txt")')
+    parser.add_argument('-o', '--out-dir', default='translated', help='каталог результатов')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='число процессов')
+    parser.add_argument('--lexer', choices=sorted(LEXERS), default='regex')
+    parser.add_argument('--no-fold', action='store_true', help='без свертки констант')
+    parser.add_argument('--no-reuse-temps', action='store_true', help='без переиспользования временных $N')
+    parser.add_argument('--no-compiled', action='store_true', help='выражения - обходом деревьев, без замыканий (closures.py)')
+    parser.add_argument('--tac', action='store_true', help='листинг трехадресного кода в <имя>.tac.txt')
+    args = parser.parse_args(argv)
+
+    log = stream_sink(sys.stderr, interval=0.5)
+    paths = expand_sources(args.sources)
+    if not paths:
+        log.write('Нет файлов для трансляции')
+        log.flush(force=True)
+        return 2
+
+    # Результаты раскладываются по каталогам источников относительно их общего каталога
+    root = source_root(paths)
+    collisions = output_collisions(paths, args.out_dir, root)
+    if collisions:
+        for base, group in collisions.items():
+            log.write(f'Одинаковый путь результатов {base}.*: {", ".join(group)}')
+        log.flush(force=True)
+        return 2
+
+    settings = {
+        'lexer': args.lexer,
+        'fold': not args.no_fold,
+        'reuse_temps': not args.no_reuse_temps,
+        'compiled': not args.no_compiled,
+        'tac': args.tac,
+    }
+    start = time.perf_counter()
+    summaries = []
+    with ProcessPoolExecutor(max_workers=max(args.jobs, 1)) as executor:
+        chunksize = max(1, len(paths) // (max(args.jobs, 1) * 8))
+        results = executor.map(
+            translate_file,
+            paths,
+            [args.out_dir] * len(paths),
+            [root] * len(paths),
+            [settings] * len(paths),
+            chunksize=chunksize,
+        )
+        for summary in results:
+            summaries.append(summary)
+            if not summary['ok']:
+                log.write(f'{summary["path"]}: {summary["error"]}')
+            log.flush()
+    wall = time.perf_counter() - start
+
+    failed = [summary for summary in summaries if not summary['ok']]
+    print(f'Файлов: {len(summaries)}, успешно: {len(summaries) - len(failed)}, с ошибками: {len(failed)}')
+    print(f'Токенов: {sum(s["tokens"] for s in summaries)}, операций: {sum(s["operations"] for s in summaries)}')
+    print(f'Время: {wall:.2f} с, процессов: {args.jobs}')
+    print('Сумма по фазам:')
+    print(format_timings(total_timings(summaries)))
+    log.flush(force=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
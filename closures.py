@@ -0,0 +1,259 @@
+import operator
+
+from data import *
+from tree import evaluate
+from logic_tree import evaluate_logic
+
+
+# ============================================================================
+# КОМПИЛЯЦИЯ ВЫРАЖЕНИЙ В ЗАМЫКАНИЯ
+# ============================================================================
+
+# Замыкание выражения: run(variables, operations) -> (значение, переменная_с_результатом),
+# значение и записи трассы те же, что у обхода дерева (tree.evaluate, logic_tree.evaluate_logic).
+# Разбор констант, вид переменной (скаляр или массив) и операция выбираются
+# при компиляции; редкие случаи (ошибки, неизвестные операции) выполняет обход дерева.
+
+ARITHMETIC_OPS = {
+    ('+', 1): (operator.add, '+'),
+    ('+', 2): (operator.sub, '-'),
+    ('*', 1): (operator.mul, '*'),
+}
+
+RELATIONS = {
+    1: (operator.lt, '<'),
+    2: (operator.le, '<='),
+    3: (operator.gt, '>'),
+    4: (operator.ge, '>='),
+    5: (operator.eq, '=='),
+    6: (operator.ne, '!='),
+}
+
+
+def walk_expression(tree, var_type: str):
+    def run(variables, operations):
+        return evaluate(tree, variables, var_type, operations)
+    return run
+
+
+def walk_logic(tree, var_type: str):
+    def run(variables, operations):
+        return evaluate_logic(tree, variables, var_type, operations)
+    return run
+
+
+def constant(value, var_type: str, shown):
+    """Константа: временная $N со значением shown в трассе"""
+    def run(variables, operations):
+        var = SimpleVar(name=f'${operations.last_index}', type=var_type, value=shown)
+        operations.append(var)
+        return value, var
+    return run
+
+
+def scalar(slot: int, reset: bool):
+    """Скаляр; reset - чтение неинициализированного значения записывает в него 0 (как в tree.evaluate)"""
+    def run(variables, operations):
+        var_ass = variables.slots[slot]
+        var = var_ass.snapshot()
+        value = var_ass.value
+        if value is None:
+            value = 0
+            if reset:
+                var_ass.value = 0
+        operations.append(var)
+        return value, var
+    return run
+
+
+def array_element(slot: int, index):
+    def run(variables, operations):
+        var_ass = variables.slots[slot]
+        index_val, _ = index(variables, operations)
+        if not isinstance(index_val, int):
+            index_val = int(index_val)
+        if index_val < 0 or index_val >= var_ass.size:
+            raise Exception(f'Array index {index_val} out of bounds [0, {var_ass.size})')
+        value = var_ass.values.get(index_val)
+        if value is None:
+            value = 0
+        var = SimpleVar(name=f'{var_ass.name}[{index_val}]', type=var_ass.type, value=value)
+        operations.append(var)
+        return value, var
+    return run
+
+
+def binary(left, right, var_type: str, op, sign: str):
+    def run(variables, operations):
+        left_val, lvar = left(variables, operations)
+        right_val, rvar = right(variables, operations)
+        var = SimpleVar(name=f'${operations.last_index}', type=var_type, value=f'{lvar.name} {sign} {rvar.name}')
+        operations.append(var)
+        return op(left_val, right_val), var
+    return run
+
+
+def division(left, right, var_type: str):
+    def run(variables, operations):
+        left_val, lvar = left(variables, operations)
+        right_val, rvar = right(variables, operations)
+        temp_name = f'${operations.last_index}'
+        if right_val == 0:
+            raise Exception('Division by zero')
+        var = SimpleVar(name=temp_name, type=var_type, value=f'{lvar.name} / {rvar.name}')
+        operations.append(var)
+        return left_val / right_val, var
+    return run
+
+
+def negation(operand, var_type: str):
+    def run(variables, operations):
+        value, operand_var = operand(variables, operations)
+        var = SimpleVar(name=f'${operations.last_index}', type=var_type, value=f'not {operand_var.name}')
+        operations.append(var)
+        return not value, var
+    return run
+
+
+def short_circuit(left, right, var_type: str, is_and: bool):
+    """&& и ||: правый операнд вычисляется, только если левый не определил результат"""
+    word = 'and' if is_and else 'or'
+
+    def run(variables, operations):
+        left_val, lvar = left(variables, operations)
+        if bool(left_val) != is_and:
+            return left_val, lvar
+        right_val, rvar = right(variables, operations)
+        var = SimpleVar(name=f'${operations.last_index}', type=var_type, value=f'{lvar.name} {word} {rvar.name}')
+        operations.append(var)
+        return right_val, var
+    return run
+
+
+def compile_variable(tree, types: dict, reset: bool):
+    """Лист-переменная, если ее вид известен из объявлений, иначе None"""
+    var = types.get(tree.token.value)
+    if isinstance(var, ArrayVar) and len(tree.indexes) == 1:
+        return array_element(tree.slot, compile_expression(tree.indexes[0], 'int', types))
+    if isinstance(var, SimpleVar) and not tree.indexes:
+        return scalar(tree.slot, reset)
+    return None
+
+
+def compile_expression(tree, var_type: str, types: dict):
+    """
+    Компиляция арифметического дерева в замыкание (см. tree.evaluate)
+
+    Args:
+        var_type: тип результата, как в evaluate
+        types: видимые переменные по именам (объявления и переменные циклов)
+    """
+    if not tree:
+        return walk_expression(tree, var_type)
+    token = tree.token
+
+    if tree.left is None and tree.right is None:
+        if token.name == 'num':
+            try:
+                value = parse_value(var_type, token.value)[0]
+            except Exception:
+                return walk_expression(tree, var_type)
+            return constant(value, var_type, value)
+        if token.name == 'const':
+            return constant(token.value, var_type, token.value)
+        return compile_variable(tree, types, reset=True) or walk_expression(tree, var_type)
+
+    key = (token.name, token.value)
+    if key not in ARITHMETIC_OPS and key != ('*', 2):
+        return walk_expression(tree, var_type)
+    left = compile_expression(tree.left, var_type, types)
+    right = compile_expression(tree.right, var_type, types)
+    if key == ('*', 2):
+        return division(left, right, var_type)
+    return binary(left, right, var_type, *ARITHMETIC_OPS[key])
+
+
+def compile_logic(tree, var_type: str, types: dict):
+    """Компиляция логического дерева в замыкание (см. logic_tree.evaluate_logic)"""
+    if not tree:
+        return walk_logic(tree, var_type)
+    token = tree.token
+
+    if tree.left is None and tree.right is None:
+        try:
+            if token.name == 'num':
+                value = parse_value('float', token.value)[0]
+                return constant(value, var_type, f'{value}')
+            if token.name in {'false', 'true'}:
+                value, parse_type = parse_value(var_type, token.name)
+                if var_type != parse_type and var_type != 'bool':
+                    return walk_logic(tree, var_type)
+                return constant(value, var_type, f'{value}')
+        except Exception:
+            return walk_logic(tree, var_type)
+        if token.name == 'const':
+            return constant(token.value, var_type, f'{token.value}')
+        return compile_variable(tree, types, reset=False) or walk_logic(tree, var_type)
+
+    if tree.right is None:
+        if token.name != 'not':
+            return walk_logic(tree, var_type)
+        return negation(compile_logic(tree.left, var_type, types), var_type)
+
+    if token.name in {'and', 'or'}:
+        left = compile_logic(tree.left, var_type, types)
+        right = compile_logic(tree.right, var_type, types)
+        return short_circuit(left, right, var_type, token.name == 'and')
+    if token.name == 'rel' and token.value in RELATIONS:
+        left = compile_logic(tree.left, var_type, types)
+        right = compile_logic(tree.right, var_type, types)
+        return binary(left, right, var_type, *RELATIONS[token.value])
+    return walk_logic(tree, var_type)
+
+
+# ============================================================================
+# КОМПИЛЯЦИЯ ПРОГРАММЫ
+# ============================================================================
+
+def set_code(tree, compile_tree, var_type: str, types: dict):
+    if tree is not None and tree.code is None:
+        tree.code = compile_tree(tree, var_type, types)
+
+
+def compile_statements(statements: list[Assignment | ForLoop], types: dict, in_loop: bool = False):
+    """Компиляция выражений в циклах (вне циклов выражение выполняется один раз - компиляция не окупается)"""
+    for statement in statements:
+        if isinstance(statement, ForLoop):
+            shadowed = types.get(statement.var_name)
+            if statement.is_new_var:
+                types[statement.var_name] = SimpleVar(name=statement.var_name, type=statement.var_type, value=None)
+            loop_var = types.get(statement.var_name)
+            if loop_var is not None:
+                if in_loop:
+                    set_code(statement.init_tree, compile_expression, loop_var.type, types)
+                set_code(statement.cond_tree, compile_logic, 'bool', types)
+                set_code(statement.incr_tree, compile_expression, loop_var.type, types)
+            compile_statements(statement.body, types, in_loop=True)
+            if statement.is_new_var:
+                if shadowed is None:
+                    del types[statement.var_name]
+                else:
+                    types[statement.var_name] = shadowed
+        elif in_loop:
+            var = types.get(statement.name)
+            if isinstance(var, ArrayVar):
+                set_code(statement.index_tree, compile_expression, 'int', types)
+                set_code(statement.tree, compile_expression, var.type, types)
+            elif isinstance(var, SimpleVar):
+                set_code(statement.tree, compile_logic if statement.is_logic else compile_expression, var.type, types)
+
+
+def compile_program(program: Program) -> Program:
+    """
+    Компиляция корневых деревьев выражений в циклах программы в замыкания (Node.code)
+
+    Программа со слотами (resolve_slots). Уже скомпилированные деревья
+    не компилируются повторно; при сериализации замыкания отбрасываются.
+    """
+    compile_statements(program.body, {var.name: var for var in program.declarations})
+    return program
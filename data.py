@@ -1,5 +1,6 @@
 import dataclasses
 import typing
+from array import array
 from enum import StrEnum
 from collections import defaultdict
 
@@ -79,6 +80,115 @@ class SimpleVar:
         """Установка значения с приведением типа"""
         self.value, _ = parse_value(self.type, value)
 
+    def snapshot(self) -> 'SimpleVar':
+        """Снимок текущего значения для трассы (без глубокого копирования)"""
+        return SimpleVar(name=self.name, type=self.type, value=self.value, addr=self.addr)
+
+
+# Коды array для типов элементов: int - 64-битный, значения int вне его
+# диапазона (скаляры int не ограничены) переводят страницу в список
+ARRAY_TYPECODES = {
+    'int': 'q',
+    'float': 'd',
+    'bool': 'B',
+}
+
+# Число элементов в странице PagedArray
+PAGE_SIZE = 4096
+
+
+class PagedArray:
+    """
+    Типизированное хранилище значений массива
+
+    Значения лежат в страницах array по PAGE_SIZE элементов, страница
+    выделяется при первой записи в нее, поэтому большой массив ничего
+    не стоит, пока к нему не обращались. Для каждой страницы хранятся
+    признаки инициализации элементов (неинициализированный элемент - None).
+    Страница, в которую записано не помещающееся в array значение,
+    становится списком объектов.
+    """
+    __slots__ = ('type', 'typecode', 'size', 'pages', 'flags')
+
+    def __init__(self, var_type: str, size: int):
+        self.type = var_type
+        self.typecode = ARRAY_TYPECODES[var_type]
+        self.size = size
+        self.pages: dict[int, array | list] = {}
+        self.flags: dict[int, bytearray] = {}
+
+    def _page(self, page_index: int) -> tuple[array, bytearray]:
+        page = self.pages.get(page_index)
+        if page is None:
+            length = min(PAGE_SIZE, self.size - page_index * PAGE_SIZE)
+            page = self.pages[page_index] = array(self.typecode, bytes(length * array(self.typecode).itemsize))
+            self.flags[page_index] = bytearray(length)
+        return page, self.flags[page_index]
+
+    def _spill(self, page_index: int) -> list:
+        """Перевод страницы в список объектов"""
+        page = self.pages[page_index]
+        if isinstance(page, array):
+            page = self.pages[page_index] = page.tolist()
+        return page
+
+    def get(self, index: int):
+        page_index, offset = divmod(index, PAGE_SIZE)
+        flags = self.flags.get(page_index)
+        if flags is None or not flags[offset]:
+            return None
+        value = self.pages[page_index][offset]
+        return bool(value) if self.type == 'bool' else value
+
+    def set(self, index: int, value):
+        page_index, offset = divmod(index, PAGE_SIZE)
+        page, flags = self._page(page_index)
+        try:
+            page[offset] = value
+        except OverflowError:
+            self._spill(page_index)[offset] = value
+        flags[offset] = 1
+
+    def get_slice(self, start: int, stop: int) -> list:
+        return [self.get(index) for index in range(start, stop)]
+
+    def set_slice(self, start: int, values):
+        """Запись подряд идущих значений, по странице за раз"""
+        values = list(values)
+        pos = 0
+        while pos < len(values):
+            page_index, offset = divmod(start + pos, PAGE_SIZE)
+            page, flags = self._page(page_index)
+            count = min(len(page) - offset, len(values) - pos)
+            chunk = values[pos:pos + count]
+            try:
+                page[offset:offset + count] = array(self.typecode, chunk) if isinstance(page, array) else chunk
+            except OverflowError:
+                self._spill(page_index)[offset:offset + count] = chunk
+            flags[offset:offset + count] = b'\x01' * count
+            pos += count
+
+    def window(self, start: int, stop: int) -> 'PagedArray':
+        """Хранилище того же размера только со страницами элементов [start, stop) (для передачи в процесс)"""
+        part = PagedArray(self.type, self.size)
+        if start < stop:
+            for page_index in range(start // PAGE_SIZE, (stop - 1) // PAGE_SIZE + 1):
+                if page_index in self.pages:
+                    part.pages[page_index] = self.pages[page_index]
+                    part.flags[page_index] = self.flags[page_index]
+        return part
+
+    def items(self):
+        """Пары (индекс, значение) инициализированных элементов"""
+        for page_index in sorted(self.pages):
+            base = page_index * PAGE_SIZE
+            for offset, flag in enumerate(self.flags[page_index]):
+                if flag:
+                    yield base + offset, self.get(base + offset)
+
+    def __repr__(self):
+        return f'PagedArray({self.type}, {dict(self.items())})'
+
 
 @dataclasses.dataclass
 class ArrayVar:
@@ -89,20 +199,30 @@ class ArrayVar:
         name: имя массива
         type: тип элементов (int, float, bool)
         size: размер массива
-        values: словарь значений с индексами
+        values: типизированное постраничное хранилище значений
         addr: адрес в памяти
     """
     name: str
     type: str
     size: int
-    values: defaultdict = dataclasses.field(default_factory=nested_dict)
+    values: PagedArray = None
     addr: int = 0
 
+    def __post_init__(self):
+        if self.values is None:
+            self.values = PagedArray(self.type, self.size)
+
     def __getitem__(self, key):
-        return self.values[key]
+        return self.get_value(key)
 
     def __setitem__(self, key, value):
-        self.values[key] = value
+        self.set_value(key, value)
+
+    def check_index(self, index):
+        if not isinstance(index, int):
+            raise TypeError(f"Array index must be int, not {type(index)}")
+        if index < 0 or index >= self.size:
+            raise IndexError(f"Array index {index} out of range [0, {self.size})")
 
     def set_value(self, index, value):
         """
@@ -112,11 +232,9 @@ class ArrayVar:
             index: индекс элемента (целое число)
             value: значение для установки
         """
-        if not isinstance(index, int):
-            raise TypeError(f"Array index must be int, not {type(index)}")
-        if index < 0 or index >= self.size:
-            raise IndexError(f"Array index {index} out of range [0, {self.size})")
-        self.values[index], _ = parse_value(self.type, value)
+        self.check_index(index)
+        value, _ = parse_value(self.type, value)
+        self.values.set(index, value)
 
     def get_value(self, index):
         """
@@ -128,14 +246,25 @@ class ArrayVar:
         Returns:
             Значение элемента или None если не инициализирован
         """
-        if not isinstance(index, int):
-            raise TypeError(f"Array index must be int, not {type(index)}")
-        if index < 0 or index >= self.size:
-            raise IndexError(f"Array index {index} out of range [0, {self.size})")
+        self.check_index(index)
         return self.values.get(index)
 
+    def get_values(self, start: int = 0, stop: int = None) -> list:
+        """Значения элементов [start, stop) списком (None - не инициализирован)"""
+        stop = self.size if stop is None else stop
+        if start < 0 or stop > self.size or start > stop:
+            raise IndexError(f"Array slice [{start}, {stop}) out of range [0, {self.size})")
+        return self.values.get_slice(start, stop)
 
-@dataclasses.dataclass
+    def set_values(self, start: int, values):
+        """Запись подряд идущих значений начиная с start с приведением типа"""
+        values = [parse_value(self.type, value)[0] for value in values]
+        if start < 0 or start + len(values) > self.size:
+            raise IndexError(f"Array slice [{start}, {start + len(values)}) out of range [0, {self.size})")
+        self.values.set_slice(start, values)
+
+
+@dataclasses.dataclass(slots=True)
 class Token:
     """
     Токен (лексема)
@@ -143,9 +272,11 @@ class Token:
     Attributes:
         name: тип токена (id, num, prog, main, и т.д.)
         value: значение токена
+        offset: позиция начала лексемы в исходном тексте
     """
     name: str
     value: any
+    offset: int = 0
 
     def __str__(self):
         return f'("{self.name}": {self.value})'
@@ -182,6 +313,9 @@ class OpCode:
     GOTO = 'goto'
     IF_GOTO = 'if_goto'
     LABEL = 'label'
+    LOAD = 'load'  # x = a[i]
+    STORE = 'store'  # a[i] = x
+    ERROR = 'error'  # ошибка выполнения с сообщением arg1
 
 
 # Категории идентификаторов
@@ -205,4 +339,186 @@ class ForLoopContext:
     """
     loop_var: SimpleVar
     start_label: str
-    end_label: str
\ No newline at end of file
+    end_label: str
+
+# ============================================================================
+# УЗЛЫ AST ОПЕРАТОРОВ
+# ============================================================================
+
+@dataclasses.dataclass
+class Assignment:
+    """
+    Оператор присваивания: Имя [Индекс]? = Выражение;
+
+    Attributes:
+        name: имя переменной слева
+        tree: дерево выражения справа
+        index_tree: дерево индекса (для элемента массива)
+        is_logic: выражение логическое (дерево logic_tree)
+        slot: слот переменной слева в Environment (resolve_slots)
+    """
+    name: str
+    tree: any
+    index_tree: any = None
+    is_logic: bool = False
+    slot: int = None
+
+
+@dataclasses.dataclass
+class ForLoop:
+    """
+    Цикл for (init; cond; incr) { body }
+
+    Attributes:
+        var_name: имя переменной-счетчика
+        var_type: тип переменной-счетчика
+        is_new_var: переменная объявлена в заголовке цикла
+        init_tree: дерево выражения инициализации
+        cond_tree: дерево логического условия
+        incr_tree: дерево выражения инкремента
+        body: операторы тела цикла
+        slot: слот переменной-счетчика в Environment (resolve_slots)
+    """
+    var_name: str
+    var_type: str
+    is_new_var: bool
+    init_tree: any
+    cond_tree: any
+    incr_tree: any
+    body: list = dataclasses.field(default_factory=list)
+    slot: int = None
+
+
+@dataclasses.dataclass
+class Program:
+    """
+    Разобранная программа, готовая к многократному выполнению
+
+    Attributes:
+        name: имя программы (после prog)
+        declarations: объявленные переменные (исходные значения)
+        type_aliases: псевдонимы типов
+        body: операторы тела main()
+        slots: имена переменных по номерам слотов (None - имена не разрешены)
+    """
+    name: str
+    declarations: list
+    type_aliases: dict
+    body: list = dataclasses.field(default_factory=list)
+    slots: list = None
+
+
+class Environment:
+    """
+    Таблица переменных при выполнении: переменные лежат в списке по слотам
+
+    Номера слотов заранее записаны в узлы деревьев и операторы (resolve_slots),
+    поэтому при выполнении переменная берется по индексу, без хеширования имени.
+    Пустой слот (None) - переменная вне области видимости.
+    Доступ по имени (get, [], in) - для анализа циклов вне горячего пути.
+    """
+    __slots__ = ('names', 'slots')
+
+    def __init__(self, names: list[str]):
+        self.names = {name: slot for slot, name in enumerate(names)}
+        self.slots: list[SimpleVar | ArrayVar | None] = [None] * len(names)
+
+    def declare(self, var: SimpleVar | ArrayVar):
+        self.slots[self.names[var.name]] = var
+
+    def get(self, name: str, default=None):
+        slot = self.names.get(name)
+        var = None if slot is None else self.slots[slot]
+        return default if var is None else var
+
+    def __getitem__(self, name: str):
+        var = self.get(name)
+        if var is None:
+            raise KeyError(name)
+        return var
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def values(self) -> list:
+        return [var for var in self.slots if var is not None]
+
+
+
+@dataclasses.dataclass
+class ExecOptions:
+    """
+    Параметры выполнения программы
+
+    Attributes:
+        workers: число процессов для циклов с независимыми итерациями, когда трасса
+            не записывается (0 или 1 - все выполняется в текущем процессе)
+        compiled: выражения выполняются замыканиями (closures.py), а не обходом деревьев
+        progress: отчет о ходе выполнения и отмена (utils.Progress), None - без отчета
+    """
+    workers: int = 0
+    compiled: bool = False
+    progress: any = None
+
+
+# ============================================================================
+# ТРЕХАДРЕСНЫЙ КОД
+# ============================================================================
+
+@dataclasses.dataclass
+class Quad:
+    """
+    Инструкция трехадресного кода (четверка)
+
+    Attributes:
+        op: код операции (OpCode)
+        arg1: первый операнд (имя или константа)
+        arg2: второй операнд (имя, константа или None)
+        result: имя результата или метка перехода
+    """
+    op: str
+    arg1: any = None
+    arg2: any = None
+    result: any = None
+
+    def __str__(self):
+        args = ', '.join(str(arg) for arg in (self.arg1, self.arg2) if arg is not None)
+        if self.op == OpCode.LABEL:
+            return f'{self.result}:'
+        if self.op == OpCode.GOTO:
+            return f'{self.op} {self.result}'
+        if self.op == OpCode.ERROR:
+            return f'{self.op} "{self.arg1}"'
+        return f'{self.op} {args} -> {self.result}'
+
+
+@dataclasses.dataclass
+class Symbol:
+    """
+    Запись таблицы символов трехадресного кода
+
+    Attributes:
+        name: имя в трехадресном коде
+        category: категория (Category)
+        type: тип данных
+    """
+    name: str
+    category: str
+    type: str
+
+
+@dataclasses.dataclass
+class TacProgram:
+    """
+    Скомпилированная программа в трехадресном коде
+
+    Attributes:
+        code: список инструкций
+        symbols: таблица символов (имя -> Symbol)
+        declarations: объявленные переменные (исходные значения)
+        labels: позиции меток в code
+    """
+    code: list
+    symbols: dict
+    declarations: list
+    labels: dict = dataclasses.field(default_factory=dict)
@@ -1,3 +1,7 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
 from symantic import *
 
 SIZES = {
@@ -30,3 +34,63 @@ def stack_variables(operations: Operations[SimpleVar | ArrayVar]) -> str:
             pos += size
             variables.append(f"{pos:04d}:\t{var.name:10}\tSize:{size}")
     return '\n'.join(variables)
+
+
+def tac_listing(tac: TacProgram) -> str:
+    lines = []
+    for pos, quad in enumerate(tac.code):
+        lines.append(f"{pos:04d}:\t{quad}")
+    return '\n'.join(lines)
+
+
+
+class TraceLines:
+    """
+    Строки текста трассы (stack_calls, stack_variables) по номерам
+
+    Текст не разбивается на список строк: хранятся позиции начала строк,
+    окно строк - один срез текста. Так просмотр, поиск и переход по номеру
+    не зависят от длины трассы.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self.starts = array('q', [0] if text else [])
+        self.starts.extend(match.end() for match in re.finditer('\n', text))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def end(self, line: int) -> int:
+        """Позиция конца строки line (без перевода строки)"""
+        return self.starts[line + 1] - 1 if line + 1 < len(self.starts) else len(self.text)
+
+    def line(self, line: int) -> str:
+        return self.text[self.starts[line]:self.end(line)]
+
+    def window(self, start: int, count: int) -> str:
+        """Строки [start, start + count) одним текстом"""
+        stop = min(start + count, len(self)) - 1
+        if start > stop:
+            return ''
+        return self.text[self.starts[start]:self.end(stop)]
+
+    def number(self, line: int) -> int:
+        """Номер в начале строки ('0042:' - позиция в трассе или адрес)"""
+        prefix = self.text[self.starts[line]:self.end(line)].split(':', 1)[0]
+        return int(prefix) if prefix.isdigit() else -1
+
+    def find_number(self, number: int) -> int:
+        """Первая строка с номером не меньше number (номера строк возрастают)"""
+        return min(bisect_left(range(len(self)), number, key=self.number), max(len(self) - 1, 0))
+
+    def find(self, query: str, start: int = 0) -> int | None:
+        """Первая строка, начиная со start, содержащая query (с переходом в начало)"""
+        if not query or not self.text:
+            return None
+        start = min(max(start, 0), len(self) - 1)
+        pos = self.text.find(query, self.starts[start])
+        if pos == -1:
+            pos = self.text.find(query, 0, self.starts[start] + len(query) - 1)
+        if pos == -1:
+            return None
+        return bisect_right(self.starts, pos) - 1
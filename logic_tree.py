@@ -1,4 +1,3 @@
-from copy import deepcopy
 from data import *
 
 
@@ -7,9 +6,15 @@ class Node:
     def __init__(self, token: Token, left=None, right=None):
         self.token = token
         self.indexes = []  # Для индексов массивов
+        self.slot = None   # Слот переменной в Environment (resolve_slots)
+        self.code = None   # Замыкание корня выражения (closures.compile_program)
         self.left = left
         self.right = right
 
+    def __getstate__(self):
+        # Замыкания не сериализуются (кэш, передача в процессы)
+        return {**self.__dict__, 'code': None}
+
     def __repr__(self):
         if self.left and self.right:
             return f"({self.left} {self.token} {self.right})"
@@ -139,14 +144,14 @@ def build_expression_tree_logic(lst: list[Token], pos: int):
     return values[0] if values else None, pos
 
 
-def evaluate_logic(tree: Node, variables: dict[str, SimpleVar | ArrayVar], var_type: str,
+def evaluate_logic(tree: Node, variables: Environment, var_type: str,
                    operations: list[SimpleVar | ArrayVar]) -> tuple[bool | int | float, SimpleVar | ArrayVar]:
     """
     Вычисляет значение логического выражения, представленного деревом
     
     Args:
         tree: корень дерева выражения
-        variables: таблица символов
+        variables: таблица переменных (листы берут переменную по tree.slot)
         var_type: ожидаемый тип результата (обычно 'bool')
         operations: список операций для промежуточного кода
         
@@ -189,13 +194,21 @@ def evaluate_logic(tree: Node, variables: dict[str, SimpleVar | ArrayVar], var_t
             operations.append(var)
             return value_ass, var
         
+        # Константа, вычисленная при свертке (optimize.fold_constants)
+        if token.name == 'const':
+            var = SimpleVar(
+                name=f'${operations.last_index}',
+                type=var_type,
+                value=f'{value}',
+            )
+            operations.append(var)
+            return value, var
+        
         # Переменная или массив
-        var_ass = variables.get(value)
-        if not var_ass:
+        var_ass = variables.slots[tree.slot]
+        if var_ass is None:
             raise Exception(f'Undeclared variable: \'{token}\'')
         
-        var = deepcopy(var_ass)
-        
         # Обработка массива с индексами
         if isinstance(var_ass, ArrayVar):
             if not tree.indexes:
@@ -230,6 +243,7 @@ def evaluate_logic(tree: Node, variables: dict[str, SimpleVar | ArrayVar], var_t
         elif isinstance(var_ass, SimpleVar):
             if tree.indexes:
                 raise Exception(f'Variable \'{value}\' is not an array')
+            var = var_ass.snapshot()
             value_ass = var_ass.value
             if value_ass is None:
                 value_ass = 0  # Неинициализированные переменные = 0
@@ -257,6 +271,12 @@ def evaluate_logic(tree: Node, variables: dict[str, SimpleVar | ArrayVar], var_t
 
     # Бинарные операции
     left_val, lvar = evaluate_logic(tree.left, variables, var_type, operations)
+
+    # Сокращенное вычисление: правый операнд не вычисляется и не попадает
+    # в трассу, если результат определен левым
+    if token.name == 'and' and not left_val or token.name == 'or' and left_val:
+        return left_val, lvar
+
     right_val, rvar = evaluate_logic(tree.right, variables, var_type, operations)
 
     temp_name = f'${operations.last_index}'
@@ -1,8 +1,15 @@
+import sys
+import threading
+import traceback
+from functools import partial
+
 import PySimpleGUI as sg
 
 from synth import *
 from interfaces import *
 from symantic import *
+from pipeline import *
+from utils import Progress, Cancelled, LogSink, stream_sink, read_source
 
 filename = 'program.txt'
 
@@ -30,7 +37,16 @@ LAYOUT = [
         sg.InputText(key='filepath', expand_x=True),
         sg.FileBrowse('Выбор', key='browse', change_submits=True),
         sg.Button('Загрузить', key='load_input'),
-        sg.Submit('Старт', key='start')
+        sg.Submit('Старт', key='start'),
+        sg.Button('Отмена', key='cancel_translation', disabled=True),
+    ],
+    [
+        sg.Text('Трасса:'),
+        sg.InputText(key='trace_query', size=(20, 1)),
+        sg.Button('Найти', key='trace_find'),
+        sg.Text('Позиция:'),
+        sg.InputText(key='trace_position', size=(10, 1)),
+        sg.Button('Перейти', key='trace_goto'),
     ],
     [
         sg.Multiline(
@@ -47,6 +63,14 @@ LAYOUT = [
             expand_x=True,
             expand_y=True
         ),
+        sg.Slider(
+            range=(0, 0),
+            orientation='v',
+            key='stack_callable_scroll',
+            enable_events=True,
+            disable_number_display=True,
+            expand_y=True
+        ),
         sg.Multiline(
             size=(25, 30), 
             key="stack_variable",
@@ -54,6 +78,14 @@ LAYOUT = [
             expand_x=True,
             expand_y=True
         ),
+        sg.Slider(
+            range=(0, 0),
+            orientation='v',
+            key='stack_variable_scroll',
+            enable_events=True,
+            disable_number_display=True,
+            expand_y=True
+        ),
     ],
     [
         sg.Multiline(
@@ -63,17 +95,138 @@ LAYOUT = [
             expand_x=True
         )
     ],
+    [
+        sg.Text('', key='progress', expand_x=True)
+    ],
 ]
 
 DEBUG = False
 
-def print_to_output(window, message):
-    """Вывод сообщения в окно output"""
+# Лексический анализатор: 'fsm' - посимвольный автомат, 'regex' - на регулярном выражении
+LEXER = 'regex'
+
+# Хранение трассы: 'list' - список SimpleVar, 'columnar' - колонки array, 'spill' - со сбросом на диск,
+# 'none' - без трассы, только итоговые значения (счетные циклы выполняются через NumPy, если он установлен)
+TRACE_STORAGE = 'list'
+
+# Число записей трассы в памяти для 'spill', сверх него записи сбрасываются на диск
+TRACE_MEMORY_CAP = 100_000
+
+# Свертка и распространение констант перед выполнением
+# (False - неоптимизированная трасса, например для обучения)
+FOLD_CONSTANTS = True
+
+# Переиспользование временных $N по анализу живучести: в распределении памяти
+# остается пиковое число одновременно живых временных переменных
+REUSE_TEMPORARIES = True
+
+# Листинг трехадресного кода программы (tac.py) в окне output
+SHOW_TAC = False
+
+# Выполнение выражений замыканиями, скомпилированными из деревьев (False - обход деревьев)
+COMPILE_EXPRESSIONS = True
+
+# Число процессов для циклов с независимыми итерациями при TRACE_STORAGE = 'none'
+# (0 или 1 - без пула процессов; с записью трассы циклы выполняются последовательно)
+WORKERS = 0
+
+# Число строк трассы в окне stack_callable / stack_variable, остальные показываются прокруткой
+TRACE_PAGE_LINES = 500
+
+# Окно output: сообщения выводятся пачками не чаще раза в OUTPUT_FLUSH_MS мс,
+# хранятся последние OUTPUT_MAX_LINES строк
+OUTPUT_FLUSH_MS = 100
+OUTPUT_MAX_LINES = 2000
+
+# Кэш результатов трансляции на диске (None - отключен)
+CACHE_DIR = '.translator_cache'
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def operations_factory():
+    """Конструктор трассы операций с учетом TRACE_STORAGE"""
+    if TRACE_STORAGE == 'spill':
+        return partial(SpillOperations, max_in_memory=TRACE_MEMORY_CAP)
+    return TRACE_STORAGES[TRACE_STORAGE]
+
+
+def open_cache():
+    """Кэш результатов трансляции с учетом CACHE_DIR"""
+    if CACHE_DIR is None:
+        return None
     try:
-        current = window['output'].get()
-        window['output'].update(current + '\n' + message)
-    except:
-        print(message)
+        return TranslationCache(CACHE_DIR, CACHE_MAX_BYTES)
+    except OSError as e:
+        print(f'Кэш недоступен: {e}')
+        return None
+
+
+def output_sink(window) -> LogSink:
+    """Журнал в окно output: дописывание пачками, не больше OUTPUT_MAX_LINES строк"""
+    return LogSink(
+        append=lambda text: window['output'].update(text, append=True),
+        replace=lambda text: window['output'].update(text),
+        max_lines=OUTPUT_MAX_LINES,
+        interval=OUTPUT_FLUSH_MS / 1000,
+    )
+
+
+class TraceViewer:
+    """
+    Просмотр большой трассы: в Multiline key только TRACE_PAGE_LINES строк,
+    начиная с top, положение окна задается слайдером key + '_scroll'
+    """
+    def __init__(self, window, key: str):
+        self.window = window
+        self.key = key
+        self.lines = TraceLines('')
+        self.top = 0
+
+    def load(self, text: str):
+        self.lines = TraceLines(text)
+        self.window[self.key + '_scroll'].update(range=(0, max(len(self.lines) - 1, 0)))
+        self.show(0)
+
+    def show(self, top: int):
+        self.top = min(max(int(top), 0), max(len(self.lines) - 1, 0))
+        self.window[self.key].update(self.lines.window(self.top, TRACE_PAGE_LINES))
+        self.window[self.key + '_scroll'].update(value=self.top)
+
+    def find(self, query: str) -> bool:
+        """Переход к следующей строке с query"""
+        line = self.lines.find(query, self.top + 1)
+        if line is None:
+            return False
+        self.show(line)
+        return True
+
+    def goto(self, number: int):
+        """Переход к строке с номером (позицией в трассе или адресом) number"""
+        self.show(self.lines.find_number(number))
+
+
+def translate_in_background(window, program_text: str, cache, progress: Progress):
+    """
+    Трансляция в рабочем потоке: окно получает события 'translation_progress' (ход трансляции)
+    и по завершении 'translated' (результат), 'translation_cancelled' или 'translation_failed'
+    """
+    try:
+        result = translate(
+            program_text,
+            LEXER,
+            operations_factory(),
+            cache,
+            reuse_temps=REUSE_TEMPORARIES,
+            fold=FOLD_CONSTANTS,
+            options=ExecOptions(workers=WORKERS, compiled=COMPILE_EXPRESSIONS, progress=progress),
+            tac=SHOW_TAC,
+        )
+    except Cancelled:
+        window.write_event_value('translation_cancelled', None)
+    except Exception as e:
+        window.write_event_value('translation_failed', (e, traceback.format_exc()))
+    else:
+        window.write_event_value('translated', result)
 
 
 def main():
@@ -86,11 +239,20 @@ def main():
     
     # Переменная для хранения текста программы
     current_program_text = None
+    cache = open_cache()
+    # Ход текущей трансляции (None - трансляция не идет)
+    progress = None
+    calls_view = TraceViewer(window, 'stack_callable')
+    memory_view = TraceViewer(window, 'stack_variable')
+    log = output_sink(window)
     
     while True:
-        event, values = window.read()
+        log.flush()
+        event, values = window.read(timeout=OUTPUT_FLUSH_MS)
         
         if event in (None, 'Exit', 'Cancel'):
+            if progress is not None:
+                progress.cancel()
             break
         
         if event == 'load_input':
@@ -99,67 +261,98 @@ def main():
                 filepath = values['browse']
                 
                 if not filepath:
-                    print_to_output(window, 'Пожалуйста, выберите файл')
+                    log.write('Пожалуйста, выберите файл')
                     continue
                 
                 # Читаем файл с обработкой разных кодировок
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        current_program_text = f.read()
-                except UnicodeDecodeError:
-                    try:
-                        with open(filepath, 'r', encoding='cp1251') as f:
-                            current_program_text = f.read()
-                    except:
-                        with open(filepath, 'r', encoding='latin-1') as f:
-                            current_program_text = f.read()
+                current_program_text = read_source(filepath)
                 
                 # Отображаем содержимое файла
                 window['file_input'].update(current_program_text)
                 window['filepath'].update(filepath)
-                # print_to_output(window, f'Файл загружен: {os.path.basename(filepath)}')
-                window['output'].update(f'Файл загружен: {os.path.basename(filepath)}')
+                log.clear()
+                log.write(f'Файл загружен: {os.path.basename(filepath)}')
                 
             except FileNotFoundError:
-                print_to_output(window, f'Файл не найден: {filepath}')
+                log.write(f'Файл не найден: {filepath}')
             except Exception as e:
-                print_to_output(window, f'Ошибка при загрузке файла: {e}')
+                log.write(f'Ошибка при загрузке файла: {e}')
         
         if event == 'start':
+            # Получаем текст программы из окна
+            program_text = window['file_input'].get()
+            
+            if not program_text or program_text.strip() == '':
+                log.write('Нет программы для обработки. Загрузите файл.')
+                continue
+            
+            # Очищаем окна вывода
+            calls_view.load('')
+            memory_view.load('')
+            window['start'].update(disabled=True)
+            window['cancel_translation'].update(disabled=False)
+            
+            # Лексический анализ, разбор, выполнение и визуализация с замером фаз - в рабочем потоке,
+            # окно остается отзывчивым
+            progress = Progress(lambda progress_event: window.write_event_value('translation_progress', progress_event))
+            threading.Thread(
+                target=translate_in_background,
+                args=(window, program_text, cache, progress),
+                daemon=True,
+            ).start()
+        
+        if event == 'cancel_translation' and progress is not None:
+            progress.cancel()
+            window['progress'].update('Отмена...')
+        
+        if event == 'translation_progress' and progress is not None:
+            window['progress'].update(format_progress(values['translation_progress']))
+        
+        if event in ('translated', 'translation_cancelled', 'translation_failed'):
+            progress = None
+            window['start'].update(disabled=False)
+            window['cancel_translation'].update(disabled=True)
+            window['progress'].update('')
+        
+        if event == 'translated':
+            result = values['translated']
+            if result['cached']:
+                log.write('Результат взят из кэша')
+            log.write(f'Лексический анализ: {len(result["tokens"])} токенов')
+            log.write(f'Семантический анализ: {result["operations_count"]} операций')
+            
+            calls_view.load(result['stack_calls'])
+            memory_view.load(result['stack_variables'])
+            if result['tac'] is not None:
+                log.write('=== Трехадресный код ===')
+                log.write(result['tac'])
+            
+            log.write(format_timings(result['timings']))
+            log.write('Трансляция завершена успешно!')
+        
+        if event == 'stack_callable_scroll':
+            calls_view.show(values['stack_callable_scroll'])
+        
+        if event == 'stack_variable_scroll':
+            memory_view.show(values['stack_variable_scroll'])
+        
+        if event == 'trace_find':
+            if not calls_view.find(values['trace_query']):
+                log.write(f'Не найдено: {values["trace_query"]}')
+        
+        if event == 'trace_goto':
             try:
-                # Получаем текст программы из окна
-                program_text = window['file_input'].get()
-                
-                if not program_text or program_text.strip() == '':
-                    print_to_output(window, 'Нет программы для обработки. Загрузите файл.')
-                    continue
-                
-                # Очищаем окна вывода
-                window['stack_callable'].update('')
-                window['stack_variable'].update('')
-                
-                # 1. Лексический анализ
-                tokens = synth(program_text)
-                print_to_output(window, f'Лексический анализ: {len(tokens)} токенов')
-                
-                # 2. Семантический анализ
-                operations = symantic(tokens)
-                print_to_output(window, f'Семантический анализ: {len(operations)} операций')
-                
-                # 3. Визуализация результатов
-                stack_calls_output = stack_calls(operations)
-                stack_vars_output = stack_variables(operations)
-                
-                window['stack_callable'].update(stack_calls_output)
-                window['stack_variable'].update(stack_vars_output)
-                
-                print_to_output(window, 'Трансляция завершена успешно!')
-                
-            except Exception as e:
-                print_to_output(window, f'ОШИБКА: {e}')
-                import traceback
-                error_details = traceback.format_exc()
-                print_to_output(window, f'Подробности:\n{error_details}')
+                calls_view.goto(int(values['trace_position']))
+            except ValueError:
+                log.write(f'Позиция должна быть числом: {values["trace_position"]}')
+        
+        if event == 'translation_cancelled':
+            log.write('Трансляция отменена')
+        
+        if event == 'translation_failed':
+            error, error_details = values['translation_failed']
+            log.write(f'ОШИБКА: {error}')
+            log.write(f'Подробности:\n{error_details}')
     
     window.close()
 
@@ -167,17 +360,30 @@ def main():
 if __name__ == '__main__':
     if DEBUG:
         # без GUI
+        log = stream_sink(sys.stderr)
         try:
             program_text = read_file(filename)
-            tokens = synth(program_text)
-            operations = symantic(tokens)
+            result = translate(
+                program_text,
+                LEXER,
+                operations_factory(),
+                reuse_temps=REUSE_TEMPORARIES,
+                fold=FOLD_CONSTANTS,
+                options=ExecOptions(workers=WORKERS, compiled=COMPILE_EXPRESSIONS),
+                tac=SHOW_TAC,
+            )
             print("=== Стек вызовов ===")
-            print(stack_calls(operations))
+            print(result['stack_calls'])
             print("\n=== Распределение памяти ===")
-            print(stack_variables(operations))
+            print(result['stack_variables'])
+            if result['tac'] is not None:
+                print("\n=== Трехадресный код ===")
+                print(result['tac'])
+            print("\n=== Время фаз ===")
+            print(format_timings(result['timings']))
         except Exception as e:
-            print(f'Ошибка: {e}')
-            import traceback
-            traceback.print_exc()
+            log.write(f'Ошибка: {e}')
+            log.write(traceback.format_exc())
+        log.flush(force=True)
     else:
         main()
\ No newline at end of file
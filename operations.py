@@ -0,0 +1,389 @@
+import heapq
+import os
+import pickle
+import struct
+import tempfile
+import weakref
+from array import array
+from functools import partial
+
+from data import *
+
+
+class TempIndexes:
+    """Счетчик номеров временных переменных $N трассы (общий для хранилищ TRACE_STORAGES)"""
+    _last_index = 0
+
+    @property
+    def last_index(self):
+        self._last_index += 1
+        return self._last_index
+
+
+class Operations(TempIndexes, list):
+    """Список операций с автоинкрементным счетчиком"""
+    records = True
+
+
+def remove_file(path):
+    """Удаление файла, если он существует"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def discard_file(file, path):
+    """Закрытие и удаление файла (открытый файл в Windows удалить нельзя)"""
+    file.close()
+    remove_file(path)
+
+
+class SpillOperations(TempIndexes):
+    """
+    Трасса операций с ограничением памяти
+
+    Начальные записи (объявленные переменные) хранятся как есть - их значения
+    обновляются при выполнении. Добавленные записи копятся в буфере; когда
+    в нем max_in_memory записей, буфер дописывается в файл и очищается.
+    Итерация выдает записи по порядку, читая файл потоком.
+
+    Attributes:
+        head: начальные записи
+        buffer: записи, еще не сброшенные на диск
+        max_in_memory: максимальный размер буфера
+        path: файл для сброшенных записей
+    """
+    records = True
+
+    def __init__(self, head=(), max_in_memory: int = 100_000, path: str = None):
+        self.head = list(head)
+        self.buffer = []
+        self.max_in_memory = max_in_memory
+        self._spilled = 0
+        temporary = path is None
+        if temporary:
+            fd, path = tempfile.mkstemp(prefix='trace_', suffix='.bin')
+            os.close(fd)
+        self.path = path
+        self._file = open(path, 'wb')
+        # Временный файл закрывается и удаляется вместе с трассой
+        self._finalizer = weakref.finalize(self, discard_file, self._file, path) if temporary else None
+
+    def append(self, var: SimpleVar):
+        self.buffer.append(var)
+        if len(self.buffer) >= self.max_in_memory:
+            self.spill()
+
+    def extend(self, variables):
+        for var in variables:
+            self.append(var)
+
+    def spill(self):
+        """Сброс буфера в конец файла"""
+        if not self.buffer:
+            return
+        batch = [(var.name, var.type, var.value) for var in self.buffer]
+        pickle.dump(batch, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self._spilled += len(self.buffer)
+        self.buffer.clear()
+
+    def __len__(self):
+        return len(self.head) + self._spilled + len(self.buffer)
+
+    def __iter__(self):
+        yield from self.head
+        if self._spilled:
+            with open(self.path, 'rb') as f:
+                while True:
+                    try:
+                        batch = pickle.load(f)
+                    except EOFError:
+                        break
+                    for name, var_type, value in batch:
+                        yield SimpleVar(name=name, type=var_type, value=value)
+        yield from list(self.buffer)
+
+    def close(self):
+        """Закрытие файла трассы (временный файл удаляется)"""
+        if not self._file.closed:
+            self._file.close()
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Коды типов и видов значений для ColumnarOperations
+TYPE_CODES = {var_type: code for code, var_type in enumerate(TYPES)}
+
+KIND_NONE = 0      # None
+KIND_INT = 1       # int в колонке arg
+KIND_FLOAT = 2     # биты float в колонке arg
+KIND_BOOL = 3      # 0/1 в колонке arg
+KIND_REF = 4       # строка (имя операнда) - id в колонке arg
+KIND_UNARY = 5     # 'op x' - id x в arg, оператор в op
+KIND_BINARY = 6    # 'x op y' - id x в arg, id y в arg2, оператор в op
+KIND_OBJECT = 7    # прочие значения - индекс в objects
+
+OPERATORS = ['+', '-', '*', '/', 'and', 'or', 'not', '<', '<=', '>', '>=', '==', '!=']
+OPERATOR_CODES = {op: code for code, op in enumerate(OPERATORS)}
+
+# Временные имена '$N' не попадают в таблицу строк: id = TEMP_BIT | N
+TEMP_BIT = 1 << 31
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+FLOAT_BITS = struct.Struct('<d')
+INT_BITS = struct.Struct('<q')
+
+
+class ColumnarOperations(TempIndexes):
+    """
+    Трасса операций в колонках array вместо списка SimpleVar
+
+    Начальные записи (объявленные переменные) хранятся как есть. Для каждой
+    добавленной записи хранятся id имени в таблице строк, код типа, вид
+    значения и его аргументы: число, id операнда или пара id с оператором
+    для строк вида 'x + y'. Временные имена '$N' кодируются номером без
+    таблицы строк. Итерация восстанавливает SimpleVar по колонкам.
+    """
+    records = True
+
+    def __init__(self, head=()):
+        self.head = list(head)
+        self.strings: list[str] = []
+        self.string_ids: dict[str, int] = {}
+        self.name_col = array('I')
+        self.type_col = array('B')
+        self.kind_col = array('B')
+        self.op_col = array('B')
+        self.arg_col = array('q')
+        self.arg2_col = array('I')
+        self.objects = []
+
+    def intern(self, string: str) -> int:
+        """id строки в таблице строк"""
+        if string[0] == '$' and string[1:].isascii() and string[1:].isdigit() and string[1] != '0':
+            number = int(string[1:])
+            if number < TEMP_BIT:
+                return TEMP_BIT | number
+        string_id = self.string_ids.get(string)
+        if string_id is None:
+            string_id = self.string_ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def append(self, var: SimpleVar):
+        value = var.value
+        op = arg2 = 0
+
+        if value is None:
+            kind, arg = KIND_NONE, 0
+        elif value is True or value is False:
+            kind, arg = KIND_BOOL, int(value)
+        elif type(value) is int and INT64_MIN <= value <= INT64_MAX:
+            kind, arg = KIND_INT, value
+        elif type(value) is float:
+            kind, arg = KIND_FLOAT, INT_BITS.unpack(FLOAT_BITS.pack(value))[0]
+        elif type(value) is str:
+            parts = value.split(' ')
+            if len(parts) == 3 and parts[1] in OPERATOR_CODES:
+                kind, op = KIND_BINARY, OPERATOR_CODES[parts[1]]
+                arg, arg2 = self.intern(parts[0]), self.intern(parts[2])
+            elif len(parts) == 2 and parts[0] in OPERATOR_CODES:
+                kind, op, arg = KIND_UNARY, OPERATOR_CODES[parts[0]], self.intern(parts[1])
+            else:
+                kind, arg = KIND_REF, self.intern(value)
+        else:
+            kind, arg = KIND_OBJECT, len(self.objects)
+            self.objects.append(value)
+
+        self.name_col.append(self.intern(var.name))
+        self.type_col.append(TYPE_CODES[var.type])
+        self.kind_col.append(kind)
+        self.op_col.append(op)
+        self.arg_col.append(arg)
+        self.arg2_col.append(arg2)
+
+    def extend(self, variables):
+        for var in variables:
+            self.append(var)
+
+    def get_string(self, string_id: int) -> str:
+        """Строка по id из intern"""
+        if string_id & TEMP_BIT:
+            return f'${string_id ^ TEMP_BIT}'
+        return self.strings[string_id]
+
+    def get_value(self, row: int):
+        """Значение добавленной записи с номером row"""
+        kind = self.kind_col[row]
+        arg = self.arg_col[row]
+        if kind == KIND_REF:
+            return self.get_string(arg)
+        if kind == KIND_BINARY:
+            return f'{self.get_string(arg)} {OPERATORS[self.op_col[row]]} {self.get_string(self.arg2_col[row])}'
+        if kind == KIND_INT:
+            return arg
+        if kind == KIND_FLOAT:
+            return FLOAT_BITS.unpack(INT_BITS.pack(arg))[0]
+        if kind == KIND_BOOL:
+            return bool(arg)
+        if kind == KIND_UNARY:
+            return f'{OPERATORS[self.op_col[row]]} {self.get_string(arg)}'
+        if kind == KIND_OBJECT:
+            return self.objects[arg]
+        return None
+
+    def get_row(self, row: int) -> SimpleVar:
+        """Добавленная запись с номером row в виде SimpleVar"""
+        return SimpleVar(
+            name=self.get_string(self.name_col[row]),
+            type=TYPES[self.type_col[row]],
+            value=self.get_value(row),
+        )
+
+    def __len__(self):
+        return len(self.head) + len(self.name_col)
+
+    def __getitem__(self, pos: int):
+        if pos < 0:
+            pos += len(self)
+        if pos < len(self.head):
+            return self.head[pos]
+        if pos >= len(self):
+            raise IndexError('operations index out of range')
+        return self.get_row(pos - len(self.head))
+
+    def __iter__(self):
+        yield from self.head
+        for row in range(len(self.name_col)):
+            yield self.get_row(row)
+
+
+class NullOperations(TempIndexes):
+    """
+    Трасса без записи операций
+
+    Хранятся только начальные записи (объявленные переменные, к концу
+    выполнения - с итоговыми значениями) и число добавленных записей.
+    Пока трасса не записывается (records = False), счетные циклы for
+    могут выполняться векторно (vectorize.py).
+    """
+    records = False
+
+    def __init__(self, head=()):
+        self.head = list(head)
+        self.count = 0
+
+    def append(self, var: SimpleVar):
+        self.count += 1
+
+    def extend(self, variables):
+        for _ in variables:
+            self.count += 1
+
+    def skip(self, count: int):
+        """Учет count записей, выполненных в обход append (векторно, в процессах пула)"""
+        self.count += count
+
+    def __len__(self):
+        return len(self.head) + self.count
+
+    def __iter__(self):
+        return iter(self.head)
+
+
+TRACE_STORAGES = {
+    'list': Operations,
+    'columnar': ColumnarOperations,
+    'spill': SpillOperations,
+    'none': NullOperations,
+}
+
+
+class TempReuse(TempIndexes):
+    """
+    Переиспользование номеров временных $N по живучести при записи трассы
+
+    Примесь к хранилищу трассы: append переименовывает временную переменную
+    в свободный номер ее типа, а ее операнды ('$1 + $2') освобождают свои номера
+    до выделения номера результата. Временная переменная, на которую никто
+    не сослался (индекс, условие цикла), освобождается записью оператора
+    (имя - переменная, значение - имя результата): выражения оператора к этому
+    моменту вычислены. Трасса сразу содержит столько разных $N, сколько
+    временных одновременно живо; имена одного номера - одна общая строка.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slot_names: list[str] = []            # номер - 1 -> общая строка '$k'
+        self._slot_types: list[str] = []            # номер - 1 -> тип
+        self._free_slots: dict[str, list[int]] = {} # тип -> куча свободных номеров
+        self._live: dict[str, int] = {}             # имя живой временной -> номер
+
+    def release(self, name: str):
+        slot = self._live.pop(name, None)
+        if slot is not None:
+            heapq.heappush(self._free_slots[self._slot_types[slot]], slot)
+
+    def append(self, var: SimpleVar):
+        value = var.value
+        if type(value) is str and '$' in value:
+            for part in value.split(' '):
+                self.release(part)
+        if var.name[0] == '$':
+            pool = self._free_slots.setdefault(var.type, [])
+            if pool:
+                slot = heapq.heappop(pool)
+            else:
+                slot = len(self._slot_names)
+                self._slot_names.append(f'${slot + 1}')
+                self._slot_types.append(var.type)
+            var.name = self._slot_names[slot]
+            self._live[var.name] = slot
+        elif type(value) is str:
+            for name in list(self._live):
+                self.release(name)
+        super().append(var)
+
+    def extend(self, variables):
+        for var in variables:
+            self.append(var)
+
+
+class ReusingOperations(TempReuse, Operations):
+    """Operations с переиспользованием $N"""
+
+
+class ReusingColumnarOperations(TempReuse, ColumnarOperations):
+    """ColumnarOperations с переиспользованием $N"""
+
+
+class ReusingSpillOperations(TempReuse, SpillOperations):
+    """SpillOperations с переиспользованием $N"""
+
+
+# Хранилища трассы с переиспользованием $N (у NullOperations переименовывать нечего)
+REUSING_STORAGES = {
+    Operations: ReusingOperations,
+    ColumnarOperations: ReusingColumnarOperations,
+    SpillOperations: ReusingSpillOperations,
+}
+
+
+def reusing_temps(operations_factory):
+    """Конструктор трассы operations_factory (класс или partial) с переиспользованием $N (TempReuse)"""
+    if isinstance(operations_factory, partial):
+        return partial(
+            reusing_temps(operations_factory.func),
+            *operations_factory.args,
+            **operations_factory.keywords,
+        )
+    return REUSING_STORAGES.get(operations_factory, operations_factory)
@@ -0,0 +1,241 @@
+import operator
+
+from operations import *
+
+
+# ============================================================================
+# СВЕРТКА И РАСПРОСТРАНЕНИЕ КОНСТАНТ
+# ============================================================================
+
+def divide(left, right):
+    if right == 0:
+        raise Exception('Division by zero')
+    return left / right
+
+
+ARITHMETIC_OPS = {
+    ('+', 1): operator.add,
+    ('+', 2): operator.sub,
+    ('*', 1): operator.mul,
+    ('*', 2): divide,
+}
+
+LOGIC_OPS = {
+    ('and', 0): lambda left, right: left and right,
+    ('or', 0): lambda left, right: left or right,
+    ('rel', 1): operator.lt,
+    ('rel', 2): operator.le,
+    ('rel', 3): operator.gt,
+    ('rel', 4): operator.ge,
+    ('rel', 5): operator.eq,
+    ('rel', 6): operator.ne,
+}
+
+
+def is_const(tree) -> bool:
+    return tree is not None and tree.token.name == 'const'
+
+
+def const_leaf(tree, value):
+    """Лист 'const' с вычисленным значением вместо поддерева tree"""
+    return type(tree)(Token('const', value, tree.token.offset))
+
+
+def copy_node(tree, left, right):
+    node = type(tree)(tree.token, left, right)
+    node.indexes = tree.indexes
+    node.slot = tree.slot
+    return node
+
+
+def fold_index(tree, known: dict):
+    """Свертка индексов массива в листе-переменной"""
+    if not tree.indexes:
+        return tree
+    node = copy_node(tree, None, None)
+    node.indexes = [fold_expression(index, 'int', known) for index in tree.indexes]
+    return node
+
+
+def fold_expression(tree, var_type: str, known: dict):
+    """
+    Свертка арифметического выражения
+
+    Числа заменяются листьями 'const' со значением, разобранным в типе var_type
+    (как в tree.evaluate), переменные из known - их значениями. Операция над
+    двумя константами вычисляется сразу; если вычисление падает (деление на 0),
+    поддерево остается как есть, и ошибка возникнет при выполнении.
+    """
+    if tree is None:
+        return None
+    token = tree.token
+
+    if tree.left is None and tree.right is None:
+        if token.name == 'num':
+            try:
+                return const_leaf(tree, parse_value(var_type, token.value)[0])
+            except Exception:
+                return tree
+        if token.name == 'id' and not tree.indexes and token.value in known:
+            return const_leaf(tree, known[token.value])
+        return fold_index(tree, known)
+
+    left = fold_expression(tree.left, var_type, known)
+    right = fold_expression(tree.right, var_type, known)
+    op = ARITHMETIC_OPS.get((token.name, token.value))
+    if op and is_const(left) and is_const(right):
+        try:
+            return const_leaf(tree, op(left.token.value, right.token.value))
+        except Exception:
+            pass
+    return copy_node(tree, left, right)
+
+
+def fold_logic(tree, var_type: str, known: dict):
+    """Свертка логического выражения (числа разбираются как float, как в evaluate_logic)"""
+    if tree is None:
+        return None
+    token = tree.token
+
+    if tree.left is None and tree.right is None:
+        try:
+            if token.name == 'num':
+                return const_leaf(tree, parse_value('float', token.value)[0])
+            if token.name in {'false', 'true'}:
+                value, parse_type = parse_value(var_type, token.name)
+                if var_type == parse_type or var_type == 'bool':
+                    return const_leaf(tree, value)
+                return tree
+        except Exception:
+            return tree
+        if token.name == 'id' and not tree.indexes and token.value in known:
+            return const_leaf(tree, known[token.value])
+        return fold_index(tree, known)
+
+    if tree.right is None:
+        left = fold_logic(tree.left, var_type, known)
+        if token.name == 'not' and is_const(left):
+            return const_leaf(tree, not left.token.value)
+        return copy_node(tree, left, None)
+
+    left = fold_logic(tree.left, var_type, known)
+    # Левая константа определяет && и || - правая часть не вычисляется (см. evaluate_logic)
+    if is_const(left) and token.name in {'and', 'or'} and bool(left.token.value) == (token.name == 'or'):
+        return left
+    right = fold_logic(tree.right, var_type, known)
+    op = LOGIC_OPS.get((token.name, token.value))
+    if op and is_const(left) and is_const(right):
+        try:
+            return const_leaf(tree, op(left.token.value, right.token.value))
+        except Exception:
+            pass
+    return copy_node(tree, left, right)
+
+
+def assigned_names(statements: list[Assignment | ForLoop]) -> set[str]:
+    """Имена переменных, которым что-либо присваивается в операторах (с вложенными циклами)"""
+    names = set()
+    for statement in statements:
+        if isinstance(statement, ForLoop):
+            names.add(statement.var_name)
+            names |= assigned_names(statement.body)
+        else:
+            names.add(statement.name)
+    return names
+
+
+def fold_assignment(statement: Assignment, known: dict, types: dict) -> Assignment:
+    var = types.get(statement.name)
+    if var is None:
+        return statement
+
+    if isinstance(var, ArrayVar):
+        return Assignment(
+            name=statement.name,
+            tree=fold_expression(statement.tree, var.type, known),
+            index_tree=fold_expression(statement.index_tree, 'int', known),
+        )
+
+    if statement.is_logic:
+        tree = fold_logic(statement.tree, var.type, known)
+    else:
+        tree = fold_expression(statement.tree, var.type, known)
+
+    # Значение переменной известно, если правая часть свернулась в константу
+    known.pop(statement.name, None)
+    if is_const(tree):
+        try:
+            known[statement.name] = parse_value(var.type, tree.token.value)[0]
+        except Exception:
+            pass
+    return Assignment(name=statement.name, tree=tree, is_logic=statement.is_logic)
+
+
+def fold_for_loop(loop: ForLoop, known: dict, types: dict) -> ForLoop:
+    """
+    Свертка цикла: все, чему присваивается в цикле, на входе в условие
+    и тело неизвестно; инкремент видит состояние в конце тела
+    """
+    shadowed = types.get(loop.var_name)
+    if loop.is_new_var:
+        types[loop.var_name] = SimpleVar(name=loop.var_name, type=loop.var_type, value=None)
+    loop_var = types.get(loop.var_name)
+    if loop_var is None:
+        return loop
+
+    init_tree = fold_expression(loop.init_tree, loop_var.type, known)
+    for name in assigned_names([loop]):
+        known.pop(name, None)
+
+    cond_tree = fold_logic(loop.cond_tree, 'bool', known)
+    body_known = dict(known)
+    body = fold_statements(loop.body, body_known, types)
+    incr_tree = fold_expression(loop.incr_tree, loop_var.type, body_known)
+
+    if loop.is_new_var:
+        # Перекрытая переменная (ошибка выполнения, если цикл выполнится) снова видна
+        if shadowed is None:
+            del types[loop.var_name]
+        else:
+            types[loop.var_name] = shadowed
+
+    return ForLoop(
+        var_name=loop.var_name,
+        var_type=loop.var_type,
+        is_new_var=loop.is_new_var,
+        init_tree=init_tree,
+        cond_tree=cond_tree,
+        incr_tree=incr_tree,
+        body=body,
+    )
+
+
+def fold_statements(statements: list[Assignment | ForLoop], known: dict, types: dict) -> list:
+    """Свертка последовательности операторов, known обновляется по ходу"""
+    folded = []
+    for statement in statements:
+        if isinstance(statement, ForLoop):
+            folded.append(fold_for_loop(statement, known, types))
+        else:
+            folded.append(fold_assignment(statement, known, types))
+    return folded
+
+
+def fold_constants(program: Program) -> Program:
+    """
+    Свертка константных подвыражений и распространение известных значений
+    скалярных переменных по разобранной программе
+
+    Итоговое состояние переменных не меняется, из трассы исчезают чтения
+    переменных с известным значением и промежуточные результаты над константами.
+    Переменная становится известной только после присваивания константы:
+    чтение неинициализированной переменной имеет побочный эффект (значение 0).
+    """
+    types = {var.name: var for var in program.declarations}
+    body = fold_statements(program.body, {}, types)
+    return Program(
+        name=program.name,
+        declarations=program.declarations,
+        type_aliases=program.type_aliases,
+        body=body,
+    )
@@ -0,0 +1,238 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+
+from data import *
+from operations import *
+from vectorize import CountedLoop, LoopNotSupported, affine_offset, walk_leaves
+
+
+# ============================================================================
+# ПАРАЛЛЕЛЬНОЕ ВЫПОЛНЕНИЕ НЕЗАВИСИМЫХ ИТЕРАЦИЙ
+# ============================================================================
+
+# При меньшем числе итераций передача данных в процессы дороже выигрыша: передача
+# частей и внесение результатов стоят около 3 мс и 15% последовательного времени,
+# с двумя процессами выигрыш начинается примерно с 600 итераций короткого тела
+PARALLEL_MIN_ITERATIONS = 2_000
+
+# Частей на процесс: результаты вносятся по частям, между ними проверяется отмена
+CHUNKS_PER_WORKER = 4
+
+# Период проверки отмены (с) при ожидании результата части
+POLL_INTERVAL = 0.1
+
+# Пулы процессов по числу процессов, создаются при первом использовании
+EXECUTORS: dict[int, ProcessPoolExecutor] = {}
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    executor = EXECUTORS.get(workers)
+    if executor is None:
+        executor = EXECUTORS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return executor
+
+
+@atexit.register
+def shutdown_executors():
+    """Остановка пулов процессов (при выходе из интерпретатора)"""
+    while EXECUTORS:
+        _, executor = EXECUTORS.popitem()
+        executor.shutdown(cancel_futures=True)
+
+
+class IndependentLoop(CountedLoop):
+    """
+    Анализ зависимостей счетного цикла (CountedLoop)
+
+    Итерации независимы, если тело состоит только из присваиваний
+    A[i + c] = выражение (каждый массив пишется по одному смещению),
+    а в выражениях читаются:
+    - i и скаляры (в теле скаляры не меняются, значит, они неизменны);
+    - незаписываемые в цикле массивы - по любому индексу;
+    - записываемые массивы - только по смещению их записи (свой элемент).
+    Тогда итерация k пишет и читает только свои элементы и неизменные данные.
+    """
+    def __init__(self, loop: ForLoop, variables: Environment):
+        super().__init__(loop, variables)
+
+        self.writes: dict[str, int] = {}    # массив -> смещение записи
+        self.offsets: dict[str, set | None] = {}    # массив -> смещения обращений A[i + c] (None - любой индекс)
+        self.names = {self.var_name}        # переменные, нужные телу цикла
+        if self.bound_name is not None:
+            self.names.add(self.bound_name)
+
+        for statement in loop.body:
+            if not isinstance(statement, Assignment):
+                raise LoopNotSupported
+            var = variables.get(statement.name)
+            if not isinstance(var, ArrayVar):
+                raise LoopNotSupported
+            offset = affine_offset(statement.index_tree, self.var_name)
+            if self.writes.setdefault(statement.name, offset) != offset:
+                raise LoopNotSupported
+            self.offsets[statement.name] = {offset}
+            self.names.add(statement.name)
+
+        for statement in loop.body:
+            for tree in (statement.index_tree, statement.tree):
+                self.check_reads(tree)
+
+    def check_reads(self, tree):
+        for leaf in walk_leaves(tree):
+            token = leaf.token
+            if token.name != 'id':
+                continue
+            var = self.variables.get(token.value)
+            if leaf.indexes:
+                if not isinstance(var, ArrayVar):
+                    raise LoopNotSupported
+                if token.value in self.writes:
+                    if len(leaf.indexes) != 1:
+                        raise LoopNotSupported
+                    if affine_offset(leaf.indexes[0], self.var_name) != self.writes[token.value]:
+                        raise LoopNotSupported
+                elif self.offsets.get(token.value, set()) is not None:
+                    try:
+                        if len(leaf.indexes) != 1:
+                            raise LoopNotSupported
+                        offset = affine_offset(leaf.indexes[0], self.var_name)
+                        self.offsets.setdefault(token.value, set()).add(offset)
+                    except LoopNotSupported:
+                        self.offsets[token.value] = None
+            elif not isinstance(var, SimpleVar):
+                raise LoopNotSupported
+            self.names.add(token.value)
+
+    def chunk_variables(self, start: int, count: int) -> Environment:
+        """
+        Переменные для части из count итераций с i = start: массивы, читаемые
+        только по A[i + c], - только страницами, к которым обращается часть
+        """
+        first, last = start, start + (count - 1) * self.step
+        low, high = min(first, last), max(first, last)
+        env = Environment(list(self.variables.names))
+        for name in self.names:
+            var = self.variables[name]
+            offsets = self.offsets.get(name)
+            if isinstance(var, ArrayVar) and offsets is not None:
+                values = var.values.window(low + min(offsets), high + max(offsets) + 1)
+                var = ArrayVar(name=var.name, type=var.type, size=var.size, values=values, addr=var.addr)
+            env.declare(var)
+        return env
+
+
+def written_indexes(start: int, count: int, step: int, offset: int) -> range:
+    """Индексы элементов A[i + offset], записываемых count итерациями начиная с i = start"""
+    first = start + offset
+    return range(first, first + count * step, step)
+
+
+def run_chunk(loop: ForLoop, variables: Environment, start: int, count: int, step: int, writes: dict):
+    """
+    Выполнение count итераций цикла интерпретатором в процессе пула (без записи трассы)
+
+    Каждая итерация, как в execute_for_loop: тело, инкремент, проверка условия.
+
+    Returns:
+        (число записей трассы, {массив: значения записанных элементов в порядке итераций})
+    """
+    # Импорт внутри функции: symantic сам импортирует этот модуль
+    from symantic import execute_statements, evaluate, evaluate_logic
+
+    operations = NullOperations()
+    loop_var = variables[loop.var_name]
+    loop_var.set_value(start)
+    for _ in range(count):
+        execute_statements(loop.body, variables, operations)
+        inc_val, inc_var = evaluate(loop.incr_tree, variables, loop_var.type, operations)
+        loop_var.set_value(inc_val)
+        operations.append(
+            SimpleVar(name=loop_var.name, type=loop_var.type, value=inc_var.name)
+        )
+        evaluate_logic(loop.cond_tree, variables, 'bool', operations)
+
+    written = {
+        name: [variables[name].values.get(index) for index in written_indexes(start, count, step, offset)]
+        for name, offset in writes.items()
+    }
+    return operations.count, written
+
+
+def wait_chunk(future, progress=None):
+    """Результат части; пока его нет, раз в POLL_INTERVAL проверяется отмена (progress.check)"""
+    while True:
+        try:
+            return future.result(timeout=None if progress is None else POLL_INTERVAL)
+        except TimeoutError:
+            progress.check()
+
+
+def run_parallel(loop: ForLoop, variables: Environment, operations, workers: int, progress=None) -> bool:
+    """
+    Выполнение цикла с независимыми итерациями на пуле процессов
+
+    Вызывается после инициализации и первой (истинной) проверки условия, только
+    если трасса не записывается (operations.records = False): сборка записей
+    частей в одну трассу дороже самого выполнения. Итерации делятся на
+    workers * CHUNKS_PER_WORKER частей; части выполняются параллельно, а их
+    результаты по порядку вносятся в массивы, трасса учитывает число их записей.
+    Ошибка в части возникает после внесения предыдущих частей, как и при
+    последовательном выполнении. Между частями progress получает ход цикла
+    и может отменить трансляцию.
+
+    Returns:
+        True, если цикл выполнен; False, если его нужно выполнить интерпретатором
+    """
+    if operations.records:
+        return False
+    try:
+        plan = IndependentLoop(loop, variables)
+        start = plan.loop_var.value
+        count = plan.iteration_count(start)
+    except LoopNotSupported:
+        return False
+    if count < PARALLEL_MIN_ITERATIONS:
+        return False
+
+    # Чтение неинициализированного скаляра меняет его значение - это зависимость между итерациями
+    if any(isinstance(var, SimpleVar) and var.value is None for var in map(variables.get, plan.names)):
+        return False
+
+    executor = get_executor(workers)
+    chunk = -(-count // (workers * CHUNKS_PER_WORKER))
+    futures = []
+    for first in range(0, count, chunk):
+        size = min(chunk, count - first)
+        chunk_start = start + first * plan.step
+        futures.append((chunk_start, size, executor.submit(
+            run_chunk,
+            loop,
+            plan.chunk_variables(chunk_start, size),
+            chunk_start,
+            size,
+            plan.step,
+            plan.writes,
+        )))
+
+    try:
+        for chunk_start, size, future in futures:
+            records, written = wait_chunk(future, progress)
+            operations.skip(records)
+
+            for name, offset in plan.writes.items():
+                indexes = written_indexes(chunk_start, size, plan.step, offset)
+                values = variables[name].values
+                if plan.step == 1:
+                    values.set_slice(indexes.start, written[name])
+                else:
+                    for index, value in zip(indexes, written[name]):
+                        values.set(index, value)
+
+            plan.loop_var.set_value(chunk_start + size * plan.step)
+            if progress is not None:
+                progress.tick(plan.loop_var, operations, size)
+    finally:
+        # После ошибки или отмены оставшиеся части не нужны
+        for _, _, future in futures:
+            future.cancel()
+    return True
@@ -0,0 +1,143 @@
+from synth import *
+from interfaces import *
+from symantic import *
+from utils import timed, read_source, source_chunks
+from cache import *
+from optimize import fold_constants
+from tac import generate_tac
+
+
+# ============================================================================
+# ТРАНСЛЯЦИЯ С ЗАМЕРОМ ФАЗ
+# ============================================================================
+
+PHASE_TITLES = {
+    'lexing': 'Лексический анализ',
+    'parsing': 'Разбор объявлений и тела',
+    'folding': 'Свертка констант',
+    'tac': 'Трехадресный код',
+    'execution': 'Выполнение main()',
+    'rendering': 'Вывод результатов',
+    'cache': 'Чтение из кэша',
+}
+
+# Части результата, сохраняемые в кэше (трасса operations не сохраняется)
+CACHED_FIELDS = ['tokens', 'program', 'tac', 'operations_count', 'stack_calls', 'stack_variables']
+
+
+def translate(
+    program_text: str = None,
+    lexer: str = 'regex',
+    operations_factory=Operations,
+    cache: TranslationCache = None,
+    reuse_temps: bool = False,
+    fold: bool = False,
+    options: ExecOptions = None,
+    tac: bool = False,
+    path: str = None,
+) -> dict:
+    """
+    Полная трансляция текста программы с замером времени каждой фазы
+
+    Args:
+        fold: свертка и распространение констант перед выполнением (optimize.py)
+        reuse_temps: переиспользовать номера временных $N по живучести (operations.TempReuse)
+        tac: листинг трехадресного кода программы (tac.py) в результате
+        options: параметры выполнения (ExecOptions), на результат не влияют;
+            options.progress получает начало каждой фазы и может отменить трансляцию
+        cache: кэш результатов; при попадании трансляция не выполняется,
+            а operations в результате равно None
+        path: файл программы вместо program_text; лексер regex читает его
+            потоком (synth_iter), не загружая текст целиком
+
+    Returns:
+        словарь с ключами tokens, program, tac (листинг или None), operations, operations_count,
+        stack_calls, stack_variables, cached и timings: {фаза: {'wall': сек, 'cpu': сек}}
+    """
+    timings = {}
+    progress = options.progress if options else None
+
+    if cache is not None:
+        with timed(timings, 'cache'):
+            key = cache_key(
+                program_text if path is None else source_chunks(path),
+                lexer=lexer,
+                reuse_temps=reuse_temps,
+                fold=fold,
+                tac=tac,
+                records=getattr(operations_factory, 'records', True),
+            )
+            entry = cache.get(key)
+        if entry is not None:
+            return {**entry, 'operations': None, 'cached': True, 'timings': timings}
+
+    if progress is not None:
+        progress.phase('lexing')
+    with timed(timings, 'lexing'):
+        if path is None:
+            tokens = LEXERS[lexer](program_text)
+        elif lexer == 'regex':
+            tokens = list(synth_iter(path))
+        else:
+            tokens = LEXERS[lexer](read_source(path))
+    if progress is not None:
+        progress.phase('parsing', tokens=len(tokens))
+    with timed(timings, 'parsing'):
+        program = parse_program(tokens)
+    if fold:
+        with timed(timings, 'folding'):
+            program = fold_constants(program)
+    listing = None
+    if tac:
+        with timed(timings, 'tac'):
+            listing = tac_listing(generate_tac(program))
+    if reuse_temps:
+        operations_factory = reusing_temps(operations_factory)
+    if progress is not None:
+        progress.phase('execution', tokens=len(tokens))
+    with timed(timings, 'execution'):
+        operations = execute_program(program, operations_factory, options)
+    if progress is not None:
+        progress.phase('rendering', operations=len(operations))
+    with timed(timings, 'rendering'):
+        calls = stack_calls(operations)
+        memory = stack_variables(operations)
+
+    result = {
+        'tokens': tokens,
+        'program': program,
+        'tac': listing,
+        'operations': operations,
+        'operations_count': len(operations),
+        'stack_calls': calls,
+        'stack_variables': memory,
+        'cached': False,
+        'timings': timings,
+    }
+    if cache is not None:
+        cache.put(key, {field: result[field] for field in CACHED_FIELDS})
+    return result
+
+
+def format_progress(event: dict) -> str:
+    """Строка состояния по событию utils.Progress"""
+    parts = [PHASE_TITLES.get(event['phase'], event['phase'])]
+    if 'tokens' in event:
+        parts.append(f'токенов: {event["tokens"]}')
+    if 'operations' in event:
+        parts.append(f'операций: {event["operations"]}')
+    if 'loop' in event:
+        parts.append(f'{event["loop"]} = {event["iteration"]}')
+    return ', '.join(parts)
+
+
+def format_timings(timings: dict) -> str:
+    """Таблица времени фаз для окна output"""
+    lines = []
+    for phase, timing in timings.items():
+        title = PHASE_TITLES.get(phase, phase)
+        lines.append(f'{title}: {timing["wall"] * 1000:.1f} мс (CPU {timing["cpu"] * 1000:.1f} мс)')
+    total_wall = sum(timing['wall'] for timing in timings.values())
+    total_cpu = sum(timing['cpu'] for timing in timings.values())
+    lines.append(f'Всего: {total_wall * 1000:.1f} мс (CPU {total_cpu * 1000:.1f} мс)')
+    return '\n'.join(lines)
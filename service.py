@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from pipeline import *
+
+
+# ============================================================================
+# СЕРВИС ТРАНСЛЯЦИИ (JSON LINES)
+# ============================================================================
+
+# Запрос - одна строка JSON:
+#   {"id": ..., "source": "prog ...", "lexer": "regex", "fold": true, "reuse_temps": false, "compiled": false, "tac": false}
+# Ответ - одна строка JSON с тем же id:
+#   {"id": ..., "ok": true, "tokens": [[имя, значение], ...], "operations_count": N,
+#    "stack_calls": "...", "stack_variables": "...", "tac": "листинг" или null,
+#    "timings": {фаза: {"wall": с, "cpu": с}}}
+#   или {"id": ..., "ok": false, "error": "..."}
+
+WARM_UP_SOURCE = 'prog Warm; int a[4]; main() { for (int i = 0; i < 4; i = i + 1) { a[i] = i * 2; } }'
+
+
+def warm_up():
+    """Инициализатор процесса пула: импорт модулей и первая трансляция до первого запроса"""
+    translate(WARM_UP_SOURCE)
+
+
+def handle_request(request: dict) -> dict:
+    """Трансляция по запросу; ошибки программы возвращаются в ответе, а не бросаются"""
+    response = {'id': request.get('id'), 'ok': False}
+    try:
+        result = translate(
+            request['source'],
+            request.get('lexer', 'regex'),
+            fold=request.get('fold', True),
+            reuse_temps=request.get('reuse_temps', False),
+            options=ExecOptions(compiled=request.get('compiled', False)),
+            tac=request.get('tac', False),
+        )
+    except Exception as e:
+        response['error'] = f'{type(e).__name__}: {e}'
+        return response
+
+    response.update(
+        ok=True,
+        tokens=[[token.name, token.value] for token in result['tokens']],
+        operations_count=result['operations_count'],
+        stack_calls=result['stack_calls'],
+        stack_variables=result['stack_variables'],
+        tac=result['tac'],
+        timings=result['timings'],
+    )
+    return response
+
+
+class TranslationService:
+    """
+    Прием запросов и выдача ответов JSON lines
+
+    Запросы выполняются теплым пулом процессов (workers > 0) или в текущем
+    процессе (workers = 0). submit() не ждет трансляции: reply(ответ) вызывается
+    по ее завершении, поэтому ответы на конвейер запросов могут идти не по порядку.
+    """
+    def __init__(self, workers: int):
+        self.executor = None
+        if workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+            # Процессы создаются по мере надобности - заполняем пул сразу
+            for future in [self.executor.submit(warm_up) for _ in range(workers)]:
+                future.result()
+        else:
+            warm_up()
+
+    def submit(self, line: str, reply):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict) or not isinstance(request.get('source'), str):
+                raise ValueError('request must be an object with a string "source"')
+        except ValueError as e:
+            reply({'id': None, 'ok': False, 'error': f'Bad request: {e}'})
+            return None
+
+        if self.executor is None:
+            reply(handle_request(request))
+            return None
+        future = self.executor.submit(handle_request, request)
+
+        def done(future):
+            try:
+                response = future.result()
+            except BaseException as e:
+                # Ответ на каждый запрос обязателен: иначе serve_lines ждет его бесконечно
+                response = {'id': request.get('id'), 'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            reply(response)
+        future.add_done_callback(done)
+        return future
+
+    def serve_lines(self, lines, write):
+        """Запросы из итератора строк, ответы - write(строка); возврат после ответа на все запросы"""
+        lock = threading.Lock()
+        finished = threading.Condition(lock)
+        pending = 0
+
+        def reply(response: dict):
+            nonlocal pending
+            text = json.dumps(response, ensure_ascii=False) + '\n'
+            with lock:
+                write(text)
+                pending -= 1
+                finished.notify_all()
+
+        for line in lines:
+            if not line.strip():
+                continue
+            with lock:
+                pending += 1
+            self.submit(line, reply)
+
+        with lock:
+            finished.wait_for(lambda: pending == 0)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+def serve_stdin(service: TranslationService):
+    def write(text: str):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+    service.serve_lines(sys.stdin, write)
+
+
+def serve_socket(service: TranslationService, path: str):
+    """Локальный сокет path: каждое соединение - свой поток запросов и ответов"""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode('utf-8') for line in self.rfile)
+
+            def write(text: str):
+                self.wfile.write(text.encode('utf-8'))
+                self.wfile.flush()
+            service.serve_lines(lines, write)
+
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Сервис трансляции: запросы и ответы JSON lines')
+    parser.add_argument('--socket', help='путь локального (Unix) сокета; без него - stdin/stdout')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='процессов в пуле (0 - трансляция в текущем процессе)')
+    args = parser.parse_args(argv)
+
+    # SIGTERM (kill, менеджер процессов) завершает сервис так же, как Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    service = TranslationService(args.workers)
+    try:
+        if args.socket:
+            serve_socket(service, args.socket)
+        else:
+            serve_stdin(service)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
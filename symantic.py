@@ -2,6 +2,10 @@ from copy import deepcopy
 from logic_tree import *
 from tree import *
 from data import *
+from operations import *
+from vectorize import run_vectorized
+from parallel import run_parallel
+from closures import compile_program
 
 
 # ============================================================================
@@ -46,16 +50,38 @@ def check_id(lst: list[Token], pos: int, value: any = None):
         raise Exception(f'Expected identifier{f" \'{value}\'" if value else ""}, found: \'{lst[pos]}\'')
 
 
-def check_count_braces(lst: list[Token]):
-    """Проверка парности фигурных скобок"""
-    cnt = 0
-    for pos, obj in enumerate(lst):
-        if is_key(lst, pos, '{'):
-            cnt += 1
-        if is_key(lst, pos, '}'):
-            cnt -= 1
-    if cnt != 0:
-        raise Exception('Unmatched braces: count \'{\' does not match \'}\'')
+BRACKETS = {'(': ')', '[': ']', '{': '}'}
+CLOSING_BRACKETS = {close: open_ for open_, close in BRACKETS.items()}
+
+
+def build_bracket_table(lst: list[Token]) -> list[int]:
+    """
+    Таблица парных скобок за один проход с проверкой их баланса
+
+    Returns:
+        для каждой позиции скобки (, [, {, ), ], } - позиция парной скобки, для прочих -1
+    """
+    def unmatched(pos: int):
+        if lst[pos].name in '{}':
+            return Exception('Unmatched braces: count \'{\' does not match \'}\'')
+        return Exception(f'Unmatched \'{lst[pos].name}\' at token {pos}')
+
+    table = [-1] * len(lst)
+    stack = []
+    for pos, token in enumerate(lst):
+        if token.name in BRACKETS:
+            stack.append(pos)
+        elif token.name in CLOSING_BRACKETS:
+            if not stack:
+                raise unmatched(pos)
+            if lst[stack[-1]].name != CLOSING_BRACKETS[token.name]:
+                raise unmatched(stack[-1])
+            open_pos = stack.pop()
+            table[open_pos] = pos
+            table[pos] = open_pos
+    if stack:
+        raise unmatched(stack[-1])
+    return table
 
 
 def get_num_const(lst: list[Token], pos: int) -> int:
@@ -104,7 +130,6 @@ def get_var_declaration(lst: list[Token], pos: int, type_aliases: dict) -> tuple
             name=name,
             type=var_type,
             size=size,
-            values=defaultdict(lambda: None)
         ), pos
     else:
         check_key(lst, pos, ';')
@@ -147,24 +172,30 @@ def parse_type_definition(lst: list[Token], pos: int, type_aliases: dict) -> int
 
 
 # ============================================================================
-# ПАРСИНГ ОПЕРАТОРОВ
+# ПАРСИНГ ОПЕРАТОРОВ (построение AST)
 # ============================================================================
 
 def parse_assignment(
     lst: list[Token],
     pos: int,
     variables: dict[str, SimpleVar | ArrayVar],
-    operations: list,
-) -> int:
+) -> tuple[Assignment, int]:
     """
-    Парсинг оператора присваивания
+    Парсинг оператора присваивания в узел AST
     ИСПРАВЛЕНО: правильная обработка индексов массивов с терминаторами
+
+    Присваивание необъявленной переменной разбирается до ';' без дерева:
+    ошибка возникает при выполнении (execute_assignment), поэтому тело
+    невыполняемого цикла может ссылаться на необъявленные имена.
     """
     check_id(lst, pos)
     name = lst[pos].value
     var_ass = variables.get(name)
     if not var_ass:
-        raise Exception(f'Undeclared variable: \'{name}\'')
+        end_pos = pos + 1
+        while end_pos < len(lst) and not is_keys(lst, end_pos, [';', '}'])[1]:
+            end_pos += 1
+        return Assignment(name=name, tree=None), end_pos
     
     iter_pos = pos + 1
     
@@ -177,49 +208,23 @@ def parse_assignment(
         check_key(lst, iter_pos, ']')
         iter_pos += 1
         
-        index_val, index_var = evaluate(index_tree, variables, 'int', operations)
-        if not isinstance(index_val, int):
-            index_val = int(index_val)
-        
         check_key(lst, iter_pos, 'ass')
         iter_pos += 1
         
         # ИСПРАВЛЕНО: указываем терминатор ';'
         tree, iter_pos = build_expression_tree(lst, iter_pos, terminators=[';'])
-        val, var = evaluate(tree, variables, var_ass.type, operations)
-        var_ass.set_value(index_val, val)
-        
-        operations.append(
-            SimpleVar(
-                name=f"{var_ass.name}[{index_val}]",
-                type=var_ass.type,
-                value=var.name
-            )
-        )
-        
-    elif isinstance(var_ass, SimpleVar):
-        check_key(lst, iter_pos, 'ass')
-        iter_pos += 1
-        
-        if var_ass.type == 'bool':
-            tree, iter_pos = build_expression_tree_logic(lst, iter_pos)
-            val, var = evaluate_logic(tree, variables, var_ass.type, operations)
-        else:
-            # ИСПРАВЛЕНО: указываем терминатор ';'
-            tree, iter_pos = build_expression_tree(lst, iter_pos, terminators=[';'])
-            val, var = evaluate(tree, variables, var_ass.type, operations)
-        
-        var_ass.set_value(val)
-        
-        operations.append(
-            SimpleVar(
-                name=var_ass.name,
-                type=var_ass.type,
-                value=var.name
-            )
-        )
+        return Assignment(name=name, tree=tree, index_tree=index_tree), iter_pos
+    
+    check_key(lst, iter_pos, 'ass')
+    iter_pos += 1
     
-    return iter_pos
+    if var_ass.type == 'bool':
+        tree, iter_pos = build_expression_tree_logic(lst, iter_pos)
+        return Assignment(name=name, tree=tree, is_logic=True), iter_pos
+    
+    # ИСПРАВЛЕНО: указываем терминатор ';'
+    tree, iter_pos = build_expression_tree(lst, iter_pos, terminators=[';'])
+    return Assignment(name=name, tree=tree), iter_pos
 
 
 def build_expression_tree_until(lst: list[Token], pos: int, terminators: list[str]):
@@ -231,16 +236,13 @@ def build_expression_tree_until(lst: list[Token], pos: int, terminators: list[st
     return tree, end_pos
 
 
-def build_expression_tree_logic_until(lst: list[Token], pos: int, terminators: list[str]):
-    """Построение дерева логического выражения до одного из терминаторов"""
+def build_expression_tree_logic_until(lst: list[Token], pos: int, terminators: list[str], brackets: list[int]):
+    """Построение дерева логического выражения до одного из терминаторов вне скобок"""
     end_pos = pos
-    paren_depth = 0
     while end_pos < len(lst):
-        if is_key(lst, end_pos, '('):
-            paren_depth += 1
-        elif is_key(lst, end_pos, ')'):
-            paren_depth -= 1
-        elif paren_depth == 0 and is_keys(lst, end_pos, terminators)[1]:
+        if lst[end_pos].name in BRACKETS:
+            end_pos = brackets[end_pos]  # Скобки пропускаются целиком
+        elif lst[end_pos].name in terminators:
             break
         end_pos += 1
     
@@ -253,16 +255,20 @@ def parse_for_loop(
     lst: list[Token],
     pos: int,
     variables: dict[str, SimpleVar | ArrayVar],
-    operations: list,
-    type_aliases: dict
-) -> int:
+    type_aliases: dict,
+    brackets: list[int]
+) -> tuple[ForLoop, int]:
     """
     Парсинг цикла for: for (init; cond; incr) { ... }
-    ИСПРАВЛЕНО: правильная обработка выражений с терминаторами
+    Заголовок и тело разбираются один раз, выполнение - в execute_for_loop
+
+    Необъявленная или перекрывающая видимую переменная цикла - ошибка
+    выполнения (execute_for_loop), как и необъявленные имена в теле.
     """
     check_key(lst, pos, 'for')
     pos += 1
     check_key(lst, pos, '(')
+    header_end_pos = brackets[pos]
     pos += 1
     
     # ИНИЦИАЛИЗАЦИЯ
@@ -276,98 +282,68 @@ def parse_for_loop(
         loop_var_name = lst[pos].value
         pos += 1
         
-        if loop_var_name in variables:
-            raise Exception(f'Variable \'{loop_var_name}\' already declared')
-        
         loop_var = SimpleVar(name=loop_var_name, type=var_type, value=None)
-        variables[loop_var_name] = loop_var
         is_new_var = True
     else:
         check_id(lst, pos)
         loop_var_name = lst[pos].value
         pos += 1
         
-        if loop_var_name not in variables:
-            raise Exception(f'Undeclared variable: \'{loop_var_name}\'')
-        loop_var = variables[loop_var_name]
+        loop_var = variables.get(loop_var_name)
     
     check_key(lst, pos, 'ass')
     pos += 1
     
     # ИСПРАВЛЕНО: указываем терминатор ';'
     init_tree, pos = build_expression_tree_until(lst, pos, [';'])
-    init_val, init_var = evaluate(init_tree, variables, loop_var.type, operations)
-    loop_var.set_value(init_val)
-    operations.append(
-        SimpleVar(name=loop_var.name, type=loop_var.type, value=init_var.name)
-    )
     
     check_key(lst, pos, ';')
     pos += 1
     
+    # Переменная цикла видна в условии, инкременте и теле
+    shadowed = variables.get(loop_var_name)
+    if is_new_var:
+        variables[loop_var_name] = loop_var
+    
     # УСЛОВИЕ
-    condition_start_pos = pos
-    cond_tree, pos = build_expression_tree_logic_until(lst, pos, [';'])
-    cond_val, cond_var = evaluate_logic(cond_tree, variables, 'bool', operations)
+    cond_tree, pos = build_expression_tree_logic_until(lst, pos, [';'], brackets)
     
     check_key(lst, pos, ';')
     pos += 1
     
     # ИНКРЕМЕНТ
-    increment_start_pos = pos
-    
-    # Находим закрывающую скобку
-    paren_count = 1
-    temp_pos = pos
-    while paren_count > 0:
-        if is_key(lst, temp_pos, '('):
-            paren_count += 1
-        elif is_key(lst, temp_pos, ')'):
-            paren_count -= 1
-        temp_pos += 1
-    pos = temp_pos
+    inc_pos = pos
+    pos = header_end_pos + 1
+    
+    check_id(lst, inc_pos)
+    inc_pos += 1
+    check_key(lst, inc_pos, 'ass')
+    inc_pos += 1
+    # ИСПРАВЛЕНО: указываем терминатор ')'
+    incr_tree, _ = build_expression_tree_until(lst, inc_pos, [')'])
     
     check_key(lst, pos, '{')
     body_start_pos = pos + 1
+    body_end_pos = brackets[pos]
     
-    # Находим конец тела цикла
-    brace_count = 1
-    temp_pos = pos + 1
-    while brace_count > 0:
-        if is_key(lst, temp_pos, '{'):
-            brace_count += 1
-        elif is_key(lst, temp_pos, '}'):
-            brace_count -= 1
-        temp_pos += 1
-    body_end_pos = temp_pos - 1
-    
-    # ВЫПОЛНЕНИЕ ЦИКЛА
-    while cond_val:
-        parse_statements(lst, body_start_pos, body_end_pos, variables, operations, type_aliases)
-        
-        # Инкремент
-        inc_pos = increment_start_pos
-        check_id(lst, inc_pos)
-        inc_pos += 1
-        check_key(lst, inc_pos, 'ass')
-        inc_pos += 1
-        # ИСПРАВЛЕНО: указываем терминатор ')'
-        inc_tree, _ = build_expression_tree_until(lst, inc_pos, [')'])
-        inc_val, inc_var = evaluate(inc_tree, variables, loop_var.type, operations)
-        loop_var.set_value(inc_val)
-        operations.append(
-            SimpleVar(name=loop_var.name, type=loop_var.type, value=inc_var.name)
-        )
-        
-        # Проверяем условие снова
-        cond_pos = condition_start_pos
-        cond_tree, _ = build_expression_tree_logic_until(lst, cond_pos, [';'])
-        cond_val, cond_var = evaluate_logic(cond_tree, variables, 'bool', operations)
+    body = parse_statements(lst, body_start_pos, body_end_pos, variables, type_aliases, brackets)
     
     if is_new_var:
-        del variables[loop_var_name]
-    
-    return body_end_pos + 1
+        if shadowed is None:
+            del variables[loop_var_name]
+        else:
+            variables[loop_var_name] = shadowed
+    
+    loop = ForLoop(
+        var_name=loop_var_name,
+        var_type=loop_var.type if loop_var else None,
+        is_new_var=is_new_var,
+        init_tree=init_tree,
+        cond_tree=cond_tree,
+        incr_tree=incr_tree,
+        body=body,
+    )
+    return loop, body_end_pos + 1
 
 
 def parse_statements(
@@ -375,50 +351,227 @@ def parse_statements(
     start_pos: int,
     end_pos: int,
     variables: dict,
-    operations: list,
-    type_aliases: dict
-):
-    """Парсинг последовательности операторов"""
+    type_aliases: dict,
+    brackets: list[int]
+) -> list[Assignment | ForLoop]:
+    """Парсинг последовательности операторов в список узлов AST"""
+    statements = []
     pos = start_pos
     while pos < end_pos and not is_key(lst, pos, '}'):
         if is_key(lst, pos, 'id'):
-            pos = parse_assignment(lst, pos, variables, operations)
+            statement, pos = parse_assignment(lst, pos, variables)
+            statements.append(statement)
             if is_key(lst, pos, ';'):
                 pos += 1
         elif is_key(lst, pos, 'for'):
-            pos = parse_for_loop(lst, pos, variables, operations, type_aliases)
+            statement, pos = parse_for_loop(lst, pos, variables, type_aliases, brackets)
+            statements.append(statement)
         elif is_key(lst, pos, ';'):
             pos += 1
         else:
             raise Exception(f'Unexpected token: {lst[pos]}')
+    return statements
 
 
 # ============================================================================
-# ГЛАВНАЯ ФУНКЦИЯ
+# РАЗРЕШЕНИЕ ИМЕН В СЛОТЫ
 # ============================================================================
 
-class Operations(list):
-    """Список операций с автоинкрементным счетчиком"""
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._last_index = 0
+def loop_var_names(statements: list[Assignment | ForLoop], names: dict[str, int]):
+    """Слоты переменных циклов в порядке вложенности"""
+    for statement in statements:
+        if isinstance(statement, ForLoop):
+            names.setdefault(statement.var_name, len(names))
+            loop_var_names(statement.body, names)
+
+
+def resolve_tree(tree, names: dict[str, int]):
+    """Запись слотов в листы-переменные дерева (и деревья их индексов)"""
+    if tree is None:
+        return
+    # Прочие листы (true/false в арифметике) evaluate тоже ищет как переменные
+    if tree.left is None and tree.right is None and tree.token.name not in {'num', 'const'}:
+        tree.slot = names.setdefault(tree.token.value, len(names))
+    for index in tree.indexes:
+        resolve_tree(index, names)
+    resolve_tree(tree.left, names)
+    resolve_tree(tree.right, names)
+
+
+def resolve_statements(statements: list[Assignment | ForLoop], names: dict[str, int]):
+    for statement in statements:
+        if isinstance(statement, ForLoop):
+            statement.slot = names[statement.var_name]
+            for tree in (statement.init_tree, statement.cond_tree, statement.incr_tree):
+                resolve_tree(tree, names)
+            resolve_statements(statement.body, names)
+        else:
+            statement.slot = names.setdefault(statement.name, len(names))
+            resolve_tree(statement.index_tree, names)
+            resolve_tree(statement.tree, names)
 
-    @property
-    def last_index(self):
-        self._last_index += 1
-        return self._last_index
 
+def resolve_slots(program: Program) -> Program:
+    """
+    Разрешение идентификаторов в номера слотов Environment
+
+    Слоты получают объявления (по порядку), переменные циклов, а затем прочие
+    (необъявленные) имена - их слот всегда пуст. Переменная цикла не может
+    перекрыть видимую переменную, поэтому каждому имени хватает одного слота,
+    а вход в область видимости и выход из нее - запись и очистка слота.
+    Номер слота зависит только от имени, поэтому деревья, общие для программы
+    и ее свертки (optimize.fold_constants), получают одинаковые слоты.
+    """
+    names = {var.name: slot for slot, var in enumerate(program.declarations)}
+    loop_var_names(program.body, names)
+    resolve_statements(program.body, names)
+    program.slots = list(names)
+    return program
 
-def symantic(tokens):
-    """Главная функция семантического анализа"""
+
+# ============================================================================
+# ВЫПОЛНЕНИЕ ОПЕРАТОРОВ
+# ============================================================================
+
+def run_expression(tree, variables: Environment, var_type: str, operations: list):
+    """Вычисление арифметического выражения: замыканием, если дерево скомпилировано, иначе обходом"""
+    if tree is not None and tree.code is not None:
+        return tree.code(variables, operations)
+    return evaluate(tree, variables, var_type, operations)
+
+
+def run_logic(tree, variables: Environment, var_type: str, operations: list):
+    """Вычисление логического выражения: замыканием, если дерево скомпилировано, иначе обходом"""
+    if tree is not None and tree.code is not None:
+        return tree.code(variables, operations)
+    return evaluate_logic(tree, variables, var_type, operations)
+
+
+def execute_assignment(
+    statement: Assignment,
+    variables: Environment,
+    operations: list,
+):
+    """Выполнение оператора присваивания"""
+    var_ass = variables.slots[statement.slot]
+    if var_ass is None:
+        raise Exception(f'Undeclared variable: \'{statement.name}\'')
+    
+    if isinstance(var_ass, ArrayVar):
+        index_val, index_var = run_expression(statement.index_tree, variables, 'int', operations)
+        if not isinstance(index_val, int):
+            index_val = int(index_val)
+        
+        val, var = run_expression(statement.tree, variables, var_ass.type, operations)
+        var_ass.set_value(index_val, val)
+        
+        operations.append(
+            SimpleVar(
+                name=f"{var_ass.name}[{index_val}]",
+                type=var_ass.type,
+                value=var.name
+            )
+        )
+        
+    elif isinstance(var_ass, SimpleVar):
+        if statement.is_logic:
+            val, var = run_logic(statement.tree, variables, var_ass.type, operations)
+        else:
+            val, var = run_expression(statement.tree, variables, var_ass.type, operations)
+        
+        var_ass.set_value(val)
+        
+        operations.append(
+            SimpleVar(
+                name=var_ass.name,
+                type=var_ass.type,
+                value=var.name
+            )
+        )
+
+
+def execute_for_loop(
+    loop: ForLoop,
+    variables: Environment,
+    operations: list,
+    options: ExecOptions = None,
+):
+    """Выполнение цикла for по разобранному заголовку и телу"""
+    if loop.is_new_var:
+        if variables.slots[loop.slot] is not None:
+            raise Exception(f'Variable \'{loop.var_name}\' already declared')
+        loop_var = SimpleVar(name=loop.var_name, type=loop.var_type, value=None)
+        variables.slots[loop.slot] = loop_var
+    else:
+        loop_var = variables.slots[loop.slot]
+        if loop_var is None:
+            raise Exception(f'Undeclared variable: \'{loop.var_name}\'')
+    
+    init_val, init_var = run_expression(loop.init_tree, variables, loop_var.type, operations)
+    loop_var.set_value(init_val)
+    operations.append(
+        SimpleVar(name=loop_var.name, type=loop_var.type, value=init_var.name)
+    )
+    
+    # Без записи трассы счетный цикл может выполниться векторно
+    if not operations.records and run_vectorized(loop, variables, operations):
+        cond_val = False
+    else:
+        cond_val, cond_var = run_logic(loop.cond_tree, variables, 'bool', operations)
+        # Цикл с независимыми итерациями без записи трассы - на пуле процессов
+        if cond_val and options and options.workers > 1:
+            if run_parallel(loop, variables, operations, options.workers, options.progress):
+                cond_val = False
+    
+    # ВЫПОЛНЕНИЕ ЦИКЛА
+    progress = options.progress if options else None
+    while cond_val:
+        if progress is not None:
+            progress.tick(loop_var, operations)
+        execute_statements(loop.body, variables, operations, options)
+        
+        # Инкремент
+        inc_val, inc_var = run_expression(loop.incr_tree, variables, loop_var.type, operations)
+        loop_var.set_value(inc_val)
+        operations.append(
+            SimpleVar(name=loop_var.name, type=loop_var.type, value=inc_var.name)
+        )
+        
+        # Проверяем условие снова
+        cond_val, cond_var = run_logic(loop.cond_tree, variables, 'bool', operations)
+    
+    if loop.is_new_var:
+        variables.slots[loop.slot] = None
+
+
+def execute_statements(
+    statements: list[Assignment | ForLoop],
+    variables: Environment,
+    operations: list,
+    options: ExecOptions = None,
+):
+    """Выполнение последовательности операторов"""
+    for statement in statements:
+        if isinstance(statement, ForLoop):
+            execute_for_loop(statement, variables, operations, options)
+        else:
+            execute_assignment(statement, variables, operations)
+
+
+# ============================================================================
+# ГЛАВНАЯ ФУНКЦИЯ
+# ============================================================================
+
+def parse_program(tokens) -> Program:
+    """Разбор программы: объявления и тело main() в AST (без выполнения)"""
     # Фильтруем комментарии
-    lst = [Token(name=k, value=v) for data in tokens for k, v in data.items() if k != 'com']
+    lst = [token for token in tokens if token.name != 'com']
     
     # Проверка структуры программы
     check_key(lst, 0, 'prog')
     check_id(lst, 1)
     check_key(lst, 2, ';')
-    check_count_braces(lst)
+    brackets = build_bracket_table(lst)
     
     pos = 3
     variables: dict[str, SimpleVar | ArrayVar] = {}
@@ -436,8 +589,6 @@ def symantic(tokens):
         else:
             raise Exception(f'Unexpected token in declarations: {lst[pos]}')
     
-    operations: Operations = Operations(variables.values())
-    
     # ОБРАБОТКА MAIN() { }
     check_key(lst, pos, 'main')
     pos += 1
@@ -446,23 +597,49 @@ def symantic(tokens):
     check_key(lst, pos, ')')
     pos += 1
     check_key(lst, pos, '{')
-    pos += 1
-    
-    # Находим конец main
-    brace_count = 1
-    main_start = pos
-    temp_pos = pos
-    while brace_count > 0:
-        if is_key(lst, temp_pos, '{'):
-            brace_count += 1
-        elif is_key(lst, temp_pos, '}'):
-            brace_count -= 1
-        temp_pos += 1
-    main_end = temp_pos - 1
+    main_start = pos + 1
+    main_end = brackets[pos]
     
     # Парсим тело main
-    parse_statements(lst, main_start, main_end, variables, operations, type_aliases)
+    body = parse_statements(lst, main_start, main_end, variables, type_aliases, brackets)
     
     check_key(lst, main_end, '}')
     
-    return operations
\ No newline at end of file
+    return resolve_slots(Program(
+        name=lst[1].value,
+        declarations=list(variables.values()),
+        type_aliases=type_aliases,
+        body=body,
+    ))
+
+
+def execute_program(
+    program: Program,
+    operations_factory=Operations,
+    options: ExecOptions = None,
+) -> Operations:
+    """
+    Выполнение разобранной программы, возвращает трассу операций
+
+    Args:
+        program: разобранная программа
+        operations_factory: конструктор трассы, принимает начальные записи
+            (Operations или, например, partial(SpillOperations, max_in_memory=...))
+        options: параметры выполнения (по умолчанию ExecOptions())
+    """
+    options = options or ExecOptions()
+    if program.slots is None:
+        resolve_slots(program)
+    if options.compiled:
+        compile_program(program)
+    variables = Environment(program.slots)
+    for var in program.declarations:
+        variables.declare(deepcopy(var))
+    operations: Operations = operations_factory(variables.values())
+    execute_statements(program.body, variables, operations, options)
+    return operations
+
+
+def symantic(tokens, operations_factory=Operations, options: ExecOptions = None):
+    """Главная функция семантического анализа"""
+    return execute_program(parse_program(tokens), operations_factory, options)
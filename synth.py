@@ -1,3 +1,6 @@
+import re
+import sys
+
 from utils import *
 from data import *
 
@@ -13,12 +16,14 @@ def synth(program_text):
     key_words.sort()
     state = 0
     pos = 0
+    start = 0
     identifier = ''
     digit = ''
     out_buffer = list()
     
     while pos < len(program_text):
         if state == 0:
+            start = pos
             if program_text[pos] == '<':
                 state = 1
             elif program_text[pos] == '>':
@@ -28,25 +33,25 @@ def synth(program_text):
             elif program_text[pos] == '!':
                 state = 12
             elif program_text[pos] == ';':
-                out_buffer.append({';': 0})
+                out_buffer.append(Token(';', 0, start))
             elif program_text[pos] == ',':
-                out_buffer.append({',': 0})
+                out_buffer.append(Token(',', 0, start))
             elif program_text[pos] == '.':
-                out_buffer.append({'.': 0})
+                out_buffer.append(Token('.', 0, start))
             elif program_text[pos] == '[':
-                out_buffer.append({'[': 0})
+                out_buffer.append(Token('[', 0, start))
             elif program_text[pos] == ']':
-                out_buffer.append({']': 0})
+                out_buffer.append(Token(']', 0, start))
             elif program_text[pos] == '{':
-                out_buffer.append({'{': 0})
+                out_buffer.append(Token('{', 0, start))
             elif program_text[pos] == '}':
-                out_buffer.append({'}': 0})
+                out_buffer.append(Token('}', 0, start))
             elif program_text[pos] == '(':
-                out_buffer.append({'(': 0})
+                out_buffer.append(Token('(', 0, start))
             elif program_text[pos] == ')':
-                out_buffer.append({')': 0})
+                out_buffer.append(Token(')', 0, start))
             elif program_text[pos] == '*':
-                out_buffer.append({'*': 1})
+                out_buffer.append(Token('*', 1, start))
             elif program_text[pos] == '/':
                 state = 3
             elif program_text[pos] == '&':
@@ -54,9 +59,9 @@ def synth(program_text):
             elif program_text[pos] == '|':
                 state = 8
             elif program_text[pos] == '+':
-                out_buffer.append({'+': 1})
+                out_buffer.append(Token('+', 1, start))
             elif program_text[pos] == '-':
-                out_buffer.append({'+': 2})
+                out_buffer.append(Token('+', 2, start))
             elif program_text[pos].isalpha():
                 identifier += program_text[pos]
                 state = 6
@@ -66,17 +71,17 @@ def synth(program_text):
                 
         elif state == 1:  # Состояние после '<'
             if program_text[pos] == '=':
-                out_buffer.append({'rel': 2})  # <=
+                out_buffer.append(Token('rel', 2, start))  # <=
             else:
-                out_buffer.append({'rel': 1})  # <
+                out_buffer.append(Token('rel', 1, start))  # <
                 pos -= 1
             state = 0
             
         elif state == 2:  # Состояние после '>'
             if program_text[pos] == '=':
-                out_buffer.append({'rel': 4})  # >=
+                out_buffer.append(Token('rel', 4, start))  # >=
             else:
-                out_buffer.append({'rel': 3})  # >
+                out_buffer.append(Token('rel', 3, start))  # >
                 pos -= 1
             state = 0
             
@@ -86,7 +91,7 @@ def synth(program_text):
             elif program_text[pos] == '/':
                 state = 18  # Начало однострочного комментария //
             else:
-                out_buffer.append({'*': 2})  # Деление
+                out_buffer.append(Token('*', 2, start))  # Деление
                 pos -= 1
                 state = 0
                 
@@ -96,7 +101,7 @@ def synth(program_text):
                 
         elif state == 5:  # После '*' внутри комментария
             if program_text[pos] == '/':
-                out_buffer.append({'com': 0})
+                out_buffer.append(Token('com', 0, start))
                 state = 0
             else:
                 state = 4
@@ -106,28 +111,26 @@ def synth(program_text):
                 identifier += program_text[pos]
             else:
                 if binary_find(key_words, identifier):
-                    out_buffer.append({identifier: 0})
+                    out_buffer.append(Token(KEY_WORDS[identifier], 0, start))
                 else:
-                    out_buffer.append({'id': identifier})
+                    out_buffer.append(Token('id', sys.intern(identifier), start))
                 pos -= 1
                 identifier = ''
                 state = 0
                 
         elif state == 7:  # Состояние после '&'
             if program_text[pos] == '&':
-                out_buffer.append({'and': 0})
+                out_buffer.append(Token('and', 0, start))
                 state = 0
             else:
-                print('Ошибка в автомате &&!')
-                exit(-1)
+                raise Exception('Ошибка в автомате &&!')
                 
         elif state == 8:  # Состояние после '|'
             if program_text[pos] == '|':
-                out_buffer.append({'or': 0})
+                out_buffer.append(Token('or', 0, start))
                 state = 0
             else:
-                print('Ошибка в автомате ||!')
-                exit(-1)
+                raise Exception('Ошибка в автомате ||!')
                 
         elif state == 10:  # Целая часть числа
             if program_text[pos].isdigit():
@@ -139,35 +142,34 @@ def synth(program_text):
                 digit += program_text[pos]
                 state = 15
             else:
-                out_buffer.append({'num': digit})
+                out_buffer.append(Token('num', digit, start))
                 pos -= 1
                 digit = ''
                 state = 0
                 
         elif state == 11:  # Состояние после '='
             if program_text[pos] == '=':
-                out_buffer.append({'rel': 5})  # ==
+                out_buffer.append(Token('rel', 5, start))  # ==
             else:
-                out_buffer.append({'ass': 0})  # =
+                out_buffer.append(Token('ass', 0, start))  # =
                 pos -= 1
             state = 0
             
         elif state == 12:  # Состояние после '!'
             if program_text[pos] == '=':
-                out_buffer.append({'rel': 6})  # !=
+                out_buffer.append(Token('rel', 6, start))  # !=
                 state = 0
             else:
                 pos -= 1
                 state = 0
-                out_buffer.append({'not': 0})  # !
+                out_buffer.append(Token('not', 0, start))  # !
                 
         elif state == 13:  # После точки в числе
             if program_text[pos].isdigit():
                 digit += program_text[pos]
                 state = 14
             else:
-                print('Ошибка в автомате чисел! (Состояние 13)')
-                exit(-1)
+                raise Exception('Ошибка в автомате чисел! (Состояние 13)')
                 
         elif state == 14:  # Дробная часть числа
             if program_text[pos].isdigit():
@@ -176,7 +178,7 @@ def synth(program_text):
                 digit += program_text[pos]
                 state = 15
             else:
-                out_buffer.append({'num': digit})
+                out_buffer.append(Token('num', digit, start))
                 pos -= 1
                 digit = ''
                 state = 0
@@ -189,32 +191,283 @@ def synth(program_text):
                 digit += program_text[pos]
                 state = 16
             else:
-                print('Ошибка в автомате чисел! (Состояние 15)')
-                exit(-1)
+                raise Exception('Ошибка в автомате чисел! (Состояние 15)')
                 
         elif state == 16:  # После знака в экспоненте
             if program_text[pos].isdigit():
                 digit += program_text[pos]
                 state = 17
             else:
-                print('Ошибка в автомате чисел! (Состояние 16)')
-                exit(-1)
+                raise Exception('Ошибка в автомате чисел! (Состояние 16)')
                 
         elif state == 17:  # Экспонента числа
             if program_text[pos].isdigit():
                 digit += program_text[pos]
             else:
-                out_buffer.append({'num': digit})
+                out_buffer.append(Token('num', digit, start))
                 pos -= 1
                 digit = ''
                 state = 0
                 
         elif state == 18:  # Однострочный комментарий //
             if program_text[pos] == '\n':
-                out_buffer.append({'com': 0})
+                out_buffer.append(Token('com', 0, start))
                 state = 0
             # Продолжаем читать до конца строки
             
         pos += 1
 
-    return out_buffer
\ No newline at end of file
+    return out_buffer
+
+
+# ============================================================================
+# ЛЕКСЕР НА ОСНОВЕ РЕГУЛЯРНОГО ВЫРАЖЕНИЯ
+# ============================================================================
+
+# Пропускаемые символы поглощаются перед лексемой, чтобы не тратить на них отдельное сопоставление.
+# Порядок альтернатив важен: комментарии раньше '/', двухсимвольные раньше односимвольных
+TOKEN_RE = re.compile(r"""
+    [^<>=!;,.\[\]{}()*/&|+\-A-Za-z0-9\x80-\U0010ffff]*+
+    (?:
+        (?P<id>[A-Za-z][A-Za-z0-9]*)
+      | (?P<punct>[;,.\[\]{}()*+\-])
+      | (?P<num>[0-9]+(?P<frac>\.[0-9]+)?(?P<exp>e[+-]?[0-9]+)?)
+      | (?P<op2><=|>=|==|!=|&&|\|\|)
+      | (?P<comment>/\*(?:[^*]|\*[^/])*+\*/)
+      | (?P<open_comment>/\*.*)
+      | (?P<line_comment>//[^\n]*\n)
+      | (?P<open_line_comment>//.*)
+      | (?P<op1>[<>=!/])
+      | (?P<amp>[&|])
+      | (?P<other>.)
+      | (?P<eof>\Z)
+    )
+""", re.VERBOSE | re.DOTALL)
+
+PUNCT_TOKENS = {
+    ';': (';', 0),
+    ',': (',', 0),
+    '.': ('.', 0),
+    '[': ('[', 0),
+    ']': (']', 0),
+    '{': ('{', 0),
+    '}': ('}', 0),
+    '(': ('(', 0),
+    ')': (')', 0),
+    '*': ('*', 1),
+    '+': ('+', 1),
+    '-': ('+', 2),
+}
+
+OPERATOR_TOKENS = {
+    '<=': ('rel', 2),
+    '>=': ('rel', 4),
+    '==': ('rel', 5),
+    '!=': ('rel', 6),
+    '&&': ('and', 0),
+    '||': ('or', 0),
+    '<': ('rel', 1),
+    '>': ('rel', 3),
+    '=': ('ass', 0),
+    '!': ('not', 0),
+    '/': ('*', 2),
+}
+
+# Ключевое слово -> его единственный экземпляр строки (имя токена)
+KEY_WORDS = {word: word for word in key_words}
+
+
+# Тело многострочного комментария до '*/' (пара '*x' поглощается целиком, как в автомате)
+COMMENT_BODY_RE = re.compile(r'(?:[^*]|\*[^/])*+')
+
+# Лексемы, которым для завершения нужен следующий символ
+LOOKAHEAD_KINDS = frozenset({'id', 'num', 'op1', 'amp'})
+
+# Размер блока чтения файла для synth_iter
+CHUNK_SIZE = 1 << 16
+
+
+def scan_tokens(text, pos, final, out_buffer, base=0):
+    """
+    Разбор text начиная с pos регулярным выражением TOKEN_RE
+
+    Args:
+        text: фрагмент исходного текста
+        pos: начальная позиция
+        final: text заканчивается концом файла
+        out_buffer: список, в который добавляются токены
+        base: смещение text в исходном файле (для Token.offset)
+
+    Returns:
+        (позиция, режим): режим None - разобрано до позиции, остаток text[позиция:]
+        нужно дополнить следующим блоком; 'block'/'line' - начат комментарий,
+        тело которого начинается с позиции; 'fallback' - с позиции нужен synth()
+    """
+    length = len(text)
+    append = out_buffer.append
+
+    for m in TOKEN_RE.finditer(text, pos):
+        kind = m.lastgroup
+        end = m.end()
+
+        if end == length and kind in LOOKAHEAD_KINDS:
+            if final:
+                break  # Лексема без завершающего символа отбрасывается
+            return m.start(kind), None
+
+        if kind == 'id':
+            char = text[end]
+            if char > '\x7f' and (char.isalpha() or char.isdigit()):
+                return m.start(kind), 'fallback'
+            word = m.group(kind)
+            if word in KEY_WORDS:
+                append(Token(KEY_WORDS[word], 0, base + m.start(kind)))
+            else:
+                append(Token('id', sys.intern(word), base + m.start(kind)))
+
+        elif kind == 'punct':
+            name, value = PUNCT_TOKENS[m.group(kind)]
+            append(Token(name, value, base + m.start(kind)))
+
+        elif kind == 'num':
+            if not final and end + 2 >= length:
+                return m.start(kind), None
+            char = text[end]
+            if char > '\x7f' and char.isdigit():
+                return m.start(kind), 'fallback'
+            if m.group('exp') is None and char == 'e':
+                # 'e' без показателя степени
+                tail = end + 2 if end + 1 < length and text[end + 1] in '+-' else end + 1
+                if tail == length:
+                    break
+                if text[tail].isdigit():
+                    return m.start(kind), 'fallback'
+                raise Exception(f'Ошибка в автомате чисел! (Состояние {16 if tail == end + 2 else 15})')
+            if m.group('frac') is None and m.group('exp') is None and char == '.':
+                # Точка без дробной части
+                if end + 1 == length:
+                    break
+                if text[end + 1].isdigit():
+                    return m.start(kind), 'fallback'
+                raise Exception('Ошибка в автомате чисел! (Состояние 13)')
+            append(Token('num', m.group(kind), base + m.start(kind)))
+
+        elif kind == 'op2':
+            name, value = OPERATOR_TOKENS[m.group(kind)]
+            append(Token(name, value, base + m.start(kind)))
+
+        elif kind == 'comment' or kind == 'line_comment':
+            append(Token('com', 0, base + m.start(kind)))
+
+        elif kind == 'op1':
+            name, value = OPERATOR_TOKENS[m.group(kind)]
+            append(Token(name, value, base + m.start(kind)))
+
+        elif kind == 'amp':
+            if m.group(kind) == '&':
+                raise Exception('Ошибка в автомате &&!')
+            raise Exception('Ошибка в автомате ||!')
+
+        elif kind == 'other':
+            char = m.group(kind)
+            if char.isalpha() or char.isdigit():
+                # Юникодные буквы и цифры: разбор исходным автоматом
+                return m.start(kind), 'fallback'
+
+        elif kind == 'open_comment' or kind == 'open_line_comment':
+            if final:
+                break  # Незакрытый комментарий до конца текста
+            return m.start(kind) + 2, 'block' if kind == 'open_comment' else 'line'
+
+        else:
+            break  # Конец текста
+
+    return length, None
+
+
+def synth_regex(program_text):
+    """
+    Лексический анализатор на основе одного скомпилированного регулярного выражения
+
+    Выдает тот же поток токенов, что и synth(), включая отбрасывание
+    незавершенной лексемы в конце текста и сообщения об ошибках автомата.
+    Идентификаторы и числа с не-ASCII буквами и цифрами разбираются synth().
+    """
+    text = program_text if isinstance(program_text, str) else ''.join(program_text)
+    out_buffer = list()
+    _, mode = scan_tokens(text, 0, True, out_buffer)
+    if mode == 'fallback':
+        return synth(text)
+    return out_buffer
+
+
+def synth_iter(filename, chunk_size=CHUNK_SIZE, encoding=None):
+    """
+    Потоковый лексический анализатор: читает файл блоками и выдает токены по одному
+
+    Лексема или комментарий на границе блоков дочитываются из следующего блока,
+    в памяти держится только текущий блок, поэтому расход памяти не зависит
+    от размера файла. Поток токенов (и их смещения) совпадает с synth(read_source(filename)).
+    encoding None - кодировка, в которой файл прочитал бы read_source (utils.source_encoding).
+    """
+    if encoding is None:
+        encoding = source_encoding(filename)
+    emitted = 0
+    base = 0  # Смещение buffer[0] в файле
+    comment_start = 0
+    buffer = ''
+    mode = None
+    final = False
+    with open(filename, encoding=encoding) as f:
+        while not final:
+            chunk = f.read(chunk_size)
+            final = not chunk
+            buffer += chunk
+            pos = 0
+            tokens = list()
+
+            while True:
+                if mode == 'block':
+                    end = COMMENT_BODY_RE.match(buffer, pos).end()
+                    if end + 1 >= len(buffer):
+                        # Остается пусто или '*', ожидающая '/'
+                        base += end
+                        buffer = buffer[end:]
+                        break
+                    tokens.append(Token('com', 0, comment_start))
+                    pos = end + 2
+                    mode = None
+                elif mode == 'line':
+                    end = buffer.find('\n', pos)
+                    if end < 0:
+                        base += len(buffer)
+                        buffer = ''
+                        break
+                    tokens.append(Token('com', 0, comment_start))
+                    pos = end + 1
+                    mode = None
+
+                pos, mode = scan_tokens(buffer, pos, final, tokens, base)
+                if mode is None:
+                    base += pos
+                    buffer = buffer[pos:]
+                    break
+                if mode == 'fallback':
+                    break
+                comment_start = base + pos - 2
+
+            if mode == 'fallback':
+                break
+            emitted += len(tokens)
+            yield from tokens
+
+    if mode == 'fallback':
+        # Юникодные идентификаторы: весь файл разбирается исходным автоматом
+        with open(filename, encoding=encoding) as f:
+            yield from synth(f.read())[emitted:]
+
+
+LEXERS = {
+    'fsm': synth,
+    'regex': synth_regex,
+}
@@ -0,0 +1,428 @@
+import operator
+
+from symantic import *
+
+
+# ============================================================================
+# ГЕНЕРАЦИЯ ТРЕХАДРЕСНОГО КОДА
+# ============================================================================
+
+RELATIONS = {
+    1: OpCode.LT,  # <
+    2: OpCode.LE,  # <=
+    3: OpCode.GT,  # >
+    4: OpCode.GE,  # >=
+    5: OpCode.EQ,  # ==
+    6: OpCode.NE,  # !=
+}
+
+
+class TacCode(list):
+    """Список инструкций с таблицей символов и счетчиками временных имен и меток"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.symbols: dict[str, Symbol] = {}
+        self._last_index = 0
+        self._last_label = 0
+
+    def new_temp(self, var_type: str, category: str = Category.TEMP) -> str:
+        self._last_index += 1
+        name = f'${self._last_index}'
+        self.symbols[name] = Symbol(name=name, category=category, type=var_type)
+        return name
+
+    def new_label(self) -> str:
+        self._last_label += 1
+        return f'L{self._last_label}'
+
+
+def gen_error(message: str, code: TacCode, var_type: str = None) -> str | None:
+    """
+    Ошибка, которую интерпретатор обнаруживает при выполнении (необъявленное имя,
+    индекс не у массива): инструкция error вместо ошибки компиляции, так что
+    код, до которого выполнение не доходит (тело невыполняемого цикла), допустим
+
+    Returns:
+        для выражения (var_type) - имя временной вместо результата (не вычисляется), иначе None
+    """
+    code.append(Quad(OpCode.ERROR, message))
+    return code.new_temp(var_type) if var_type else None
+
+
+def gen_array_load(tree, var: ArrayVar, scope: dict, code: TacCode) -> str:
+    """Чтение элемента массива: load a, i -> $t"""
+    if not tree.indexes:
+        return gen_error(f'Array \'{var.name}\' requires index', code, var.type)
+    if len(tree.indexes) != 1:
+        return gen_error(f'Array \'{var.name}\' requires exactly 1 index (one-dimensional)', code, var.type)
+
+    index = gen_expression(tree.indexes[0], scope, 'int', code)
+    temp = code.new_temp(var.type)
+    code.append(Quad(OpCode.LOAD, var.name, index, temp))
+    return temp
+
+
+def gen_expression(tree, scope: dict, var_type: str, code: TacCode) -> str:
+    """
+    Генерация кода арифметического выражения
+
+    Returns:
+        имя переменной с результатом
+    """
+    if not tree:
+        return gen_error('Empty expression tree', code, var_type)
+
+    token = tree.token
+
+    # Листовые узлы (операнды)
+    if tree.left is None and tree.right is None:
+        if token.name == 'num':
+            value, _ = parse_value(var_type, token.value)
+            temp = code.new_temp(var_type, Category.CONST)
+            code.append(Quad(OpCode.ASS, value, None, temp))
+            return temp
+
+        if token.name == 'const':
+            temp = code.new_temp(var_type, Category.CONST)
+            code.append(Quad(OpCode.ASS, token.value, None, temp))
+            return temp
+
+        var = scope.get(token.value)
+        if not var:
+            return gen_error(f'Undeclared variable: \'{token.value}\'', code, var_type)
+        if isinstance(var, ArrayVar):
+            return gen_array_load(tree, var, scope, code)
+        if tree.indexes:
+            return gen_error(f'Variable \'{token.value}\' is not an array', code, var_type)
+        return var.name
+
+    left = gen_expression(tree.left, scope, var_type, code)
+    right = gen_expression(tree.right, scope, var_type, code)
+
+    if token.name == '+' and token.value == 1:
+        op = OpCode.ADD
+    elif token.name == '+' and token.value == 2:
+        op = OpCode.SUB
+    elif token.name == '*' and token.value == 1:
+        op = OpCode.MULT
+    elif token.name == '*' and token.value == 2:
+        op = OpCode.DIV
+    else:
+        raise Exception(f'Unknown operation: {token}')
+
+    temp = code.new_temp(var_type)
+    code.append(Quad(op, left, right, temp))
+    return temp
+
+
+def gen_logic(tree, scope: dict, var_type: str, code: TacCode) -> str | None:
+    """
+    Генерация кода логического выражения
+
+    Returns:
+        имя переменной с результатом (None для пустого выражения)
+    """
+    if not tree:
+        return None
+
+    token = tree.token
+
+    # Листовые узлы (операнды)
+    if tree.left is None and tree.right is None:
+        if token.name == 'num':
+            value = parse_value('float', token.value)[0]
+            temp = code.new_temp(var_type, Category.CONST)
+            code.append(Quad(OpCode.ASS, value, None, temp))
+            return temp
+
+        if token.name == 'const':
+            temp = code.new_temp(var_type, Category.CONST)
+            code.append(Quad(OpCode.ASS, token.value, None, temp))
+            return temp
+
+        if token.name in {'false', 'true'}:
+            value, _ = parse_value(var_type, token.name)
+            temp = code.new_temp(var_type, Category.CONST)
+            code.append(Quad(OpCode.ASS, value, None, temp))
+            return temp
+
+        var = scope.get(token.value)
+        if not var:
+            return gen_error(f'Undeclared variable: \'{token}\'', code, var_type)
+        if isinstance(var, ArrayVar):
+            return gen_array_load(tree, var, scope, code)
+        if tree.indexes:
+            return gen_error(f'Variable \'{token.value}\' is not an array', code, var_type)
+        return var.name
+
+    # Унарная операция NOT
+    if tree.right is None:
+        operand = gen_logic(tree.left, scope, var_type, code)
+        temp = code.new_temp(var_type)
+        code.append(Quad(OpCode.NOT, operand, None, temp))
+        return temp
+
+    if token.name in {'and', 'or'}:
+        return gen_short_circuit(tree, scope, var_type, code)
+
+    left = gen_logic(tree.left, scope, var_type, code)
+    right = gen_logic(tree.right, scope, var_type, code)
+
+    if token.name == 'rel' and token.value in RELATIONS:
+        op = RELATIONS[token.value]
+    else:
+        raise Exception(f'Unknown operation: {token}')
+
+    temp = code.new_temp(var_type)
+    code.append(Quad(op, left, right, temp))
+    return temp
+
+
+def gen_short_circuit(tree, scope: dict, var_type: str, code: TacCode) -> str:
+    """
+    Генерация кода && и || с сокращенным вычислением:
+
+        left -> $l
+        ass $l -> $t
+        [not $l -> $n]          (только для &&)
+        if_goto $l | $n -> Le
+        right -> $r
+        ass $r -> $t
+    Le:
+    """
+    left = gen_logic(tree.left, scope, var_type, code)
+    result = code.new_temp(var_type)
+    end_label = code.new_label()
+    code.append(Quad(OpCode.ASS, left, None, result))
+
+    if tree.token.name == 'and':
+        negated = code.new_temp('bool')
+        code.append(Quad(OpCode.NOT, left, None, negated))
+        code.append(Quad(OpCode.IF_GOTO, negated, None, end_label))
+    else:
+        code.append(Quad(OpCode.IF_GOTO, left, None, end_label))
+
+    right = gen_logic(tree.right, scope, var_type, code)
+    code.append(Quad(OpCode.ASS, right, None, result))
+    code.append(Quad(OpCode.LABEL, result=end_label))
+    return result
+
+
+def gen_assignment(statement: Assignment, scope: dict, code: TacCode):
+    """Генерация кода оператора присваивания"""
+    var = scope.get(statement.name)
+    if not var:
+        gen_error(f'Undeclared variable: \'{statement.name}\'', code)
+        return
+
+    if isinstance(var, ArrayVar):
+        index = gen_expression(statement.index_tree, scope, 'int', code)
+        value = gen_expression(statement.tree, scope, var.type, code)
+        code.append(Quad(OpCode.STORE, value, index, var.name))
+    elif statement.is_logic:
+        value = gen_logic(statement.tree, scope, var.type, code)
+        symbol = code.symbols.get(value)
+        if symbol is not None and symbol.category == Category.VAR:
+            # Логическое чтение переменной не присваивает ей 0, в отличие от ass в переменную
+            temp = code.new_temp(var.type)
+            code.append(Quad(OpCode.ASS, value, None, temp))
+            value = temp
+        code.append(Quad(OpCode.ASS, value, None, var.name))
+    else:
+        value = gen_expression(statement.tree, scope, var.type, code)
+        code.append(Quad(OpCode.ASS, value, None, var.name))
+
+
+def gen_for_loop(loop: ForLoop, scope: dict, code: TacCode):
+    """
+    Генерация кода цикла for:
+
+        init -> i
+    Lc: cond -> $c
+        not $c -> $n
+        if_goto $n -> Le
+        body
+        incr -> i
+        goto Lc
+    Le:
+    """
+    # Ошибки переменной цикла, как в execute_for_loop, - до инициализации
+    if loop.is_new_var:
+        if loop.var_name in scope:
+            gen_error(f'Variable \'{loop.var_name}\' already declared', code)
+            return
+        # Переменная цикла получает свое имя, если такое уже занято другим типом
+        name = loop.var_name
+        suffix = 0
+        while name in code.symbols and code.symbols[name].type != loop.var_type:
+            suffix += 1
+            name = f'{loop.var_name}.{suffix}'
+        code.symbols[name] = Symbol(name=name, category=Category.VAR, type=loop.var_type)
+        loop_var = SimpleVar(name=name, type=loop.var_type, value=None)
+        scope[loop.var_name] = loop_var
+    else:
+        loop_var = scope.get(loop.var_name)
+        if not loop_var:
+            gen_error(f'Undeclared variable: \'{loop.var_name}\'', code)
+            return
+
+    value = gen_expression(loop.init_tree, scope, loop_var.type, code)
+    code.append(Quad(OpCode.ASS, value, None, loop_var.name))
+
+    cond_label = code.new_label()
+    end_label = code.new_label()
+    code.append(Quad(OpCode.LABEL, result=cond_label))
+
+    cond = gen_logic(loop.cond_tree, scope, 'bool', code)
+    if cond is None:
+        code.append(Quad(OpCode.GOTO, result=end_label))
+    else:
+        negated = code.new_temp('bool')
+        code.append(Quad(OpCode.NOT, cond, None, negated))
+        code.append(Quad(OpCode.IF_GOTO, negated, None, end_label))
+
+    gen_statements(loop.body, scope, code)
+
+    value = gen_expression(loop.incr_tree, scope, loop_var.type, code)
+    code.append(Quad(OpCode.ASS, value, None, loop_var.name))
+    code.append(Quad(OpCode.GOTO, result=cond_label))
+    code.append(Quad(OpCode.LABEL, result=end_label))
+
+    if loop.is_new_var:
+        del scope[loop.var_name]
+
+
+def gen_statements(statements: list[Assignment | ForLoop], scope: dict, code: TacCode):
+    """Генерация кода последовательности операторов"""
+    for statement in statements:
+        if isinstance(statement, ForLoop):
+            gen_for_loop(statement, scope, code)
+        else:
+            gen_assignment(statement, scope, code)
+
+
+def generate_tac(program: Program) -> TacProgram:
+    """Компиляция разобранной программы в трехадресный код"""
+    code = TacCode()
+    scope: dict[str, SimpleVar | ArrayVar] = {}
+    for var in program.declarations:
+        scope[var.name] = var
+        code.symbols[var.name] = Symbol(name=var.name, category=Category.VAR, type=var.type)
+    for alias, base_type in program.type_aliases.items():
+        code.symbols[alias] = Symbol(name=alias, category=Category.TYPE, type=base_type)
+
+    gen_statements(program.body, scope, code)
+
+    labels = {quad.result: pos for pos, quad in enumerate(code) if quad.op == OpCode.LABEL}
+    return TacProgram(
+        code=list(code),
+        symbols=code.symbols,
+        declarations=program.declarations,
+        labels=labels,
+    )
+
+
+# ============================================================================
+# ВИРТУАЛЬНАЯ МАШИНА
+# ============================================================================
+
+ARITHMETIC_OPS = {
+    OpCode.ADD: operator.add,
+    OpCode.SUB: operator.sub,
+    OpCode.MULT: operator.mul,
+}
+
+BINARY_OPS = {
+    OpCode.AND: lambda left, right: left and right,
+    OpCode.OR: lambda left, right: left or right,
+    OpCode.LT: operator.lt,
+    OpCode.LE: operator.le,
+    OpCode.GT: operator.gt,
+    OpCode.GE: operator.ge,
+    OpCode.EQ: operator.eq,
+    OpCode.NE: operator.ne,
+}
+
+
+def run_tac(tac: TacProgram) -> dict[str, SimpleVar | ArrayVar]:
+    """
+    Выполнение трехадресного кода
+
+    Каждый запуск начинается с исходных значений объявлений,
+    поэтому одну скомпилированную программу можно выполнять многократно.
+
+    Returns:
+        объявленные переменные с итоговыми значениями
+    """
+    variables = {var.name: deepcopy(var) for var in tac.declarations}
+    arrays = {name: var for name, var in variables.items() if isinstance(var, ArrayVar)}
+    env = {name: var.value for name, var in variables.items() if isinstance(var, SimpleVar)}
+    symbols = tac.symbols
+    labels = tac.labels
+    code = tac.code
+
+    def read(name):
+        """Логическое чтение: неинициализированная переменная = 0 (как logic_tree.evaluate_logic)"""
+        value = env.get(name)
+        return 0 if value is None else value
+
+    def read_arith(name):
+        """Арифметическое чтение: неинициализированной переменной присваивается 0 (как tree.evaluate)"""
+        value = env.get(name)
+        if value is None:
+            value = env[name] = 0
+        return value
+
+    pc = 0
+    while pc < len(code):
+        quad = code[pc]
+        op = quad.op
+
+        if op in ARITHMETIC_OPS:
+            env[quad.result] = ARITHMETIC_OPS[op](read_arith(quad.arg1), read_arith(quad.arg2))
+        elif op in BINARY_OPS:
+            env[quad.result] = BINARY_OPS[op](read(quad.arg1), read(quad.arg2))
+        elif op == OpCode.DIV:
+            left = read_arith(quad.arg1)
+            right = read_arith(quad.arg2)
+            if right == 0:
+                raise Exception('Division by zero')
+            env[quad.result] = left / right
+        elif op == OpCode.NOT:
+            env[quad.result] = not read(quad.arg1)
+        elif op == OpCode.ASS:
+            symbol = symbols[quad.result]
+            if symbol.category == Category.VAR:
+                # Логическое значение в переменную приходит через временную (gen_assignment)
+                env[quad.result], _ = parse_value(symbol.type, read_arith(quad.arg1))
+            elif symbol.category == Category.TEMP:
+                # Копирование во временную (результат && и ||, логическое присваивание)
+                env[quad.result] = read(quad.arg1)
+            else:
+                env[quad.result] = quad.arg1
+        elif op == OpCode.LOAD:
+            array = arrays[quad.arg1]
+            index = int(read_arith(quad.arg2))
+            if index < 0 or index >= array.size:
+                raise Exception(f'Array index {index} out of bounds [0, {array.size})')
+            value = array.get_value(index)
+            env[quad.result] = 0 if value is None else value
+        elif op == OpCode.STORE:
+            index = int(read_arith(quad.arg2))
+            arrays[quad.result].set_value(index, read_arith(quad.arg1))
+        elif op == OpCode.IF_GOTO:
+            if read(quad.arg1):
+                pc = labels[quad.result]
+        elif op == OpCode.GOTO:
+            pc = labels[quad.result]
+        elif op == OpCode.ERROR:
+            raise Exception(quad.arg1)
+        elif op != OpCode.LABEL:
+            raise Exception(f'Unknown opcode: {op}')
+
+        pc += 1
+
+    for name, var in variables.items():
+        if isinstance(var, SimpleVar):
+            var.value = env[name]
+    return variables
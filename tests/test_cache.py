@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cache
+from cache import TranslationCache
+from pipeline import translate
+from utils import read_source
+
+SOURCE = read_source(os.path.join(ROOT, 'prog.txt'))
+
+COMPARED_FIELDS = ['tac', 'operations_count', 'stack_calls', 'stack_variables']
+
+
+def summary(result: dict) -> dict:
+    return {
+        'tokens': [(token.name, token.value, token.offset) for token in result['tokens']],
+        **{field: result[field] for field in COMPARED_FIELDS},
+    }
+
+
+@pytest.fixture
+def translator_module(tmp_path, monkeypatch):
+    """Дополнительный модуль транслятора: его правка - новая версия транслятора"""
+    module = tmp_path / 'module.py'
+    module.write_text('VERSION = 1\n')
+    monkeypatch.setattr(cache, 'TRANSLATOR_MODULES', cache.TRANSLATOR_MODULES + [str(module)])
+    cache.translator_version.cache_clear()
+    yield module
+    cache.translator_version.cache_clear()
+
+
+def test_hit_returns_same_result(tmp_path):
+    results = TranslationCache(str(tmp_path / 'cache'))
+    fresh = translate(SOURCE, cache=results, tac=True)
+    cached = translate(SOURCE, cache=results, tac=True)
+    assert (fresh['cached'], cached['cached']) == (False, True)
+    assert summary(cached) == summary(fresh)
+    assert cached['operations'] is None
+
+
+def test_options_are_part_of_the_key(tmp_path):
+    results = TranslationCache(str(tmp_path / 'cache'))
+    translate(SOURCE, cache=results)
+    assert translate(SOURCE, cache=results, fold=True)['cached'] is False
+    assert translate(SOURCE + ' ', cache=results)['cached'] is False
+
+
+def test_translator_change_invalidates(tmp_path, translator_module):
+    results = TranslationCache(str(tmp_path / 'cache'))
+    translate(SOURCE, cache=results)
+    assert translate(SOURCE, cache=results)['cached'] is True
+
+    translator_module.write_text('VERSION = 2\n')
+    cache.translator_version.cache_clear()
+    assert translate(SOURCE, cache=results)['cached'] is False
+    assert translate(SOURCE, cache=results)['cached'] is True
+
+
+def test_damaged_entry_is_a_miss(tmp_path):
+    results = TranslationCache(str(tmp_path / 'cache'))
+    fresh = translate(SOURCE, cache=results)
+    [entry] = os.listdir(results.directory)
+    (tmp_path / 'cache' / entry).write_bytes(b'\x80damaged')
+    again = translate(SOURCE, cache=results)
+    assert again['cached'] is False
+    assert summary(again) == summary(fresh)
@@ -0,0 +1,31 @@
+import os
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cli
+
+
+def copy_program(target):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy(os.path.join(ROOT, 'prog.txt'), target)
+
+
+def test_same_names_keep_directories(tmp_path):
+    for student in ('a', 'b'):
+        copy_program(tmp_path / 'students' / student / 'prog.txt')
+    out = tmp_path / 'out'
+    assert cli.main([str(tmp_path / 'students' / '**' / '*.txt'), '-o', str(out), '-j', '1']) == 0
+    for student in ('a', 'b'):
+        assert (out / student / 'prog.calls.txt').exists()
+        assert (out / student / 'prog.memory.txt').exists()
+
+
+def test_output_collision_fails(tmp_path):
+    copy_program(tmp_path / 'prog.txt')
+    copy_program(tmp_path / 'prog.c')
+    out = tmp_path / 'out'
+    assert cli.main([str(tmp_path / 'prog.*'), '-o', str(out), '-j', '1']) == 2
+    assert not out.exists()
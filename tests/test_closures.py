@@ -0,0 +1,86 @@
+import glob
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import SUITE, generate_program
+from data import ArrayVar, ExecOptions
+from symantic import parse_program, execute_program, Operations
+from synth import synth_regex
+from utils import read_source
+
+
+PROGRAMS = [os.path.join(ROOT, 'prog.txt')] + sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt')))
+
+SOURCES = (
+    [read_source(path) for path in PROGRAMS]
+    + [generate_program(seed=5, **dict(params, iterations=12, array_size=12)) for params in SUITE.values()]
+)
+
+
+def record(var) -> tuple:
+    if isinstance(var, ArrayVar):
+        return var.name, var.type, var.get_values()
+    return var.name, var.type, var.value
+
+
+def run(source: str, compiled: bool):
+    """Трасса кортежами (имя, тип, значение) или текст ошибки"""
+    program = parse_program(synth_regex(source))
+    try:
+        operations = execute_program(program, Operations, ExecOptions(compiled=compiled))
+    except Exception as e:
+        return str(e)
+    return [record(var) for var in operations]
+
+
+def generate_loop(rng: random.Random) -> str:
+    """Случайный цикл: арифметика и логика над скалярами и массивами, возможны ошибки выполнения"""
+    size = rng.randint(4, 10)
+
+    def operand(depth: int) -> str:
+        if rng.random() < 0.02:
+            return 'true'
+        if depth <= 0 or rng.random() < 0.3:
+            return rng.choice(['i', 'n', 'f', 'u', '2', '0.5', f'a[i - {rng.randint(0, 1)}]', 'g[i]'])
+        op = rng.choice(['+', '-', '*', '/'])
+        return f'({operand(depth - 1)} {op} {operand(depth - 1)})'
+
+    def condition(depth: int) -> str:
+        if depth <= 0 or rng.random() < 0.4:
+            relation = rng.choice(['<', '<=', '>', '>=', '==', '!='])
+            return f'{rng.choice(["i", "n", "a[i]", "b", "true", "3"])} {relation} {rng.choice(["n", "f", "0", "g[i]"])}'
+        if rng.random() < 0.2:
+            return f'!({condition(depth - 1)})'
+        return f'({condition(depth - 1)}) {rng.choice(["&&", "||"])} ({condition(depth - 1)})'
+
+    body = [
+        f'a[i] = {operand(2)};',
+        f'g[i] = {operand(2)};',
+        f'n = {operand(2)};',
+        f'f = {operand(1)};',
+        f'b = {condition(2)};',
+    ]
+    rng.shuffle(body)
+    body = body[:rng.randint(1, len(body))]
+    return (
+        f'prog C; int a[{size}]; float g[{size}]; int n; float f; int u; bool b; '
+        f'main() {{ n = {rng.randint(0, 3)}; f = 1.5; '
+        f'for (int i = {rng.randint(0, 2)}; i < {rng.randint(size - 1, size)}; i = i + 1) {{ {" ".join(body)} }} }}'
+    )
+
+
+@pytest.mark.parametrize('source', SOURCES, ids=range(len(SOURCES)))
+def test_compiled_matches_tree_walker(source):
+    assert run(source, True) == run(source, False)
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_compiled_matches_tree_walker_random(seed):
+    source = generate_loop(random.Random(seed))
+    assert run(source, True) == run(source, False)
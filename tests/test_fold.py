@@ -0,0 +1,76 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import SUITE, generate_program
+from data import ArrayVar, ExecOptions
+from optimize import fold_constants
+from symantic import parse_program, execute_program, Operations
+from synth import synth_regex
+from utils import read_source
+
+
+PROGRAMS = [os.path.join(ROOT, 'prog.txt')] + sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt')))
+
+# Свертка не должна ни терять, ни добавлять ошибки выполнения
+CASES = {
+    'folded_zero_divisor': 'prog F; float f; int n; main() { n = 3; f = 1 / (n - 3); }',
+    'known_zero_divisor': 'prog F; int a; int z; main() { z = 0; a = 4 / z; }',
+    'zero_divisor_in_loop': 'prog F; int n; int m; int c[10]; main() { n = 0; m = 10; for (int i = 0; i < m; i = i + 1) { c[i] = i / n; } }',
+    'false_and_skips_right': 'prog F; int c[4]; bool b; bool t; main() { t = false; b = t && c[9] > 1; }',
+    'true_or_skips_right': 'prog F; int a; int c[4]; bool b; bool t; main() { t = true; b = t || c[9] > 1; b = !t && a < 2; }',
+    'true_and_evaluates_right': 'prog F; int c[4]; bool b; bool t; main() { t = true; b = t && c[9] > 1; }',
+    'constant_bounds': (
+        'prog F; int a; int n; int m; int c[10]; main() { n = 5; m = 10; '
+        'for (int i = n - 5; i < m; i = i + n / 5) { c[i] = i * n; a = a + n; } }'
+    ),
+    'constant_bounds_overflow': 'prog F; int n; int m; int c[10]; main() { n = 2; m = 12; for (int i = 0; i < m; i = i + n) { c[i] = i / (n - 1); } }',
+    'constant_bounds_down_to_zero': 'prog F; int m; int c[4]; main() { m = 0; for (int i = 3; i >= m; i = i - 1) { c[i] = 8 / i; } }',
+}
+
+SOURCES = (
+    [read_source(path) for path in PROGRAMS]
+    + [generate_program(seed=3, **dict(params, iterations=12, array_size=12)) for params in SUITE.values()]
+    + list(CASES.values())
+)
+
+
+def run(source: str, fold: bool, compiled: bool):
+    """Итоговые значения переменных или текст ошибки"""
+    program = parse_program(synth_regex(source))
+    if fold:
+        program = fold_constants(program)
+    try:
+        operations = execute_program(program, Operations, ExecOptions(compiled=compiled))
+    except Exception as e:
+        return str(e)
+    return {
+        var.name: var.get_values() if isinstance(var, ArrayVar) else var.value
+        for var in list(operations)[:len(program.declarations)]
+    }
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+@pytest.mark.parametrize('source', SOURCES, ids=range(len(SOURCES)))
+def test_folding_preserves_state_and_errors(source, compiled):
+    assert run(source, True, compiled) == run(source, False, compiled)
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('folded_zero_divisor', 'Division by zero'),
+    ('zero_divisor_in_loop', 'Division by zero'),
+    ('true_and_evaluates_right', 'Array index 9 out of bounds [0, 4)'),
+    ('constant_bounds_overflow', 'Array index 10 out of range [0, 10)'),
+])
+def test_folded_runtime_errors(name, expected):
+    assert run(CASES[name], True, False) == expected
+
+
+def test_short_circuit_with_constant_left():
+    assert run(CASES['false_and_skips_right'], True, False)['b'] is False
+    assert run(CASES['true_or_skips_right'], True, False)['b'] is False
@@ -0,0 +1,66 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cache import cache_key
+from pipeline import translate
+from synth import synth, synth_regex, synth_iter
+from utils import read_source, source_chunks
+
+
+PROGRAMS = [os.path.join(ROOT, 'prog.txt')] + sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt')))
+
+
+def token_tuples(tokens):
+    return [(token.name, token.value, token.offset) for token in tokens]
+
+
+@pytest.mark.parametrize('path', PROGRAMS, ids=os.path.basename)
+def test_regex_matches_fsm(path):
+    text = read_source(path)
+    assert token_tuples(synth_regex(text)) == token_tuples(synth(text))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64])
+@pytest.mark.parametrize('path', PROGRAMS, ids=os.path.basename)
+def test_iter_matches_fsm(path, chunk_size):
+    text = read_source(path)
+    assert token_tuples(synth_iter(path, chunk_size)) == token_tuples(synth(text))
+
+
+@pytest.mark.parametrize('text', [
+    'a = 1 & 2;',
+    'a = 1 | 2;',
+    'a = 1.x;',
+    'a = 1ex;',
+    'a = 1e+x;',
+])
+def test_errors_match_fsm(text):
+    with pytest.raises(Exception) as fsm_error:
+        synth(text)
+    with pytest.raises(Exception) as regex_error:
+        synth_regex(text)
+    assert str(regex_error.value) == str(fsm_error.value)
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'cp1251', 'latin-1'])
+def test_iter_reads_like_read_source(tmp_path, encoding):
+    path = tmp_path / 'prog.txt'
+    text = read_source(PROGRAMS[0]) + '\n// комментарий: ÿ\n'
+    path.write_bytes(text.encode(encoding, errors='replace'))
+    assert token_tuples(synth_iter(str(path), 7)) == token_tuples(synth(read_source(str(path))))
+
+
+@pytest.mark.parametrize('path', PROGRAMS, ids=os.path.basename)
+def test_translate_path_matches_text(path):
+    from_text = translate(read_source(path))
+    from_path = translate(path=path)
+    for field in ('stack_calls', 'stack_variables', 'operations_count'):
+        assert from_path[field] == from_text[field]
+    assert token_tuples(from_path['tokens']) == token_tuples(from_text['tokens'])
+    assert cache_key(source_chunks(path, 5), fold=True) == cache_key(read_source(path), fold=True)
@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import parallel
+from data import ArrayVar, ExecOptions
+from symantic import parse_program, execute_program, Operations, NullOperations
+from synth import synth_regex
+from utils import Progress, Cancelled
+
+# Независимые циклы, которые не выполняются векторно (чтение по косвенному индексу, деление)
+PROGRAMS = {
+    'gather': (
+        'prog P; int a[300]; int b[300]; int c[300]; int k; main() { k = 3; '
+        'for (int i = 0; i < 300; i = i + 1) { a[i] = i * 7 - 100; b[i] = 299 - i; } '
+        'for (int i = 0; i < 300; i = i + 1) { c[i] = a[b[i]] * 2 + k; } }'
+    ),
+    'own_element': (
+        'prog P; float f[301]; int n; main() { n = 300; '
+        'for (int i = 0; i < n; i = i + 1) { f[i + 1] = f[i + 1] + i / 4; } }'
+    ),
+    'step_down': (
+        'prog P; int a[400]; int c[400]; main() { '
+        'for (int i = 0; i < 400; i = i + 1) { a[i] = i; } '
+        'for (int i = 399; i >= 1; i = i - 2) { c[i - 1] = a[399 - i] / (a[i] + 1); } }'
+    ),
+    # Массив больше страницы PagedArray: части получают разные страницы
+    'pages': (
+        'prog P; int a[10000]; int c[10000]; main() { '
+        'for (int i = 0; i < 10000; i = i + 1) { a[i] = i * 3; } '
+        'for (int i = 1; i < 9999; i = i + 1) { c[i] = a[i - 1] + a[i + 1] * 2 - a[i] / 3; } }'
+    ),
+    'error_in_late_chunk': (
+        'prog P; int a[300]; int c[300]; main() { '
+        'for (int i = 0; i < 300; i = i + 1) { c[i] = a[i * 2]; } }'
+    ),
+}
+
+
+@pytest.fixture
+def parallel_loops(monkeypatch):
+    """Параллельное выполнение малых циклов без векторного; результаты (или ошибки) run_parallel"""
+    monkeypatch.setattr(parallel, 'PARALLEL_MIN_ITERATIONS', 10)
+    monkeypatch.setattr('symantic.run_vectorized', lambda loop, variables, operations: False)
+    calls = []
+
+    def spy(*args):
+        try:
+            calls.append(parallel.run_parallel(*args))
+        except Exception as e:
+            calls.append(e)
+            raise
+        return calls[-1]
+    monkeypatch.setattr('symantic.run_parallel', spy)
+    return calls
+
+
+def run(source: str, operations_factory, options: ExecOptions = None):
+    """(итоговые значения, число операций) или текст ошибки"""
+    program = parse_program(synth_regex(source))
+    try:
+        operations = execute_program(program, operations_factory, options)
+    except Exception as e:
+        return str(e)
+    values = {
+        var.name: var.get_values() if isinstance(var, ArrayVar) else var.value
+        for var in list(operations)[:len(program.declarations)]
+    }
+    return values, len(operations)
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_parallel_matches_sequential(name, parallel_loops):
+    source = PROGRAMS[name]
+    sequential = run(source, Operations)
+    assert run(source, NullOperations, ExecOptions(workers=2)) == sequential
+    assert parallel_loops and False not in parallel_loops
+
+
+def test_trace_is_recorded_sequentially(parallel_loops):
+    source = PROGRAMS['gather']
+    assert run(source, Operations, ExecOptions(workers=2)) == run(source, Operations)
+    assert parallel_loops and True not in parallel_loops
+
+
+def test_parallel_loop_can_be_cancelled(parallel_loops):
+    source = 'prog P; int c[200]; main() { for (int i = 0; i < 200; i = i + 1) { c[i] = i * 3; } }'
+    progress = Progress(lambda event: None, check_every=50)
+    progress.cancel()
+    with pytest.raises(Cancelled):
+        execute_program(parse_program(synth_regex(source)), NullOperations, ExecOptions(workers=2, progress=progress))
+    assert len(parallel_loops) == 1 and isinstance(parallel_loops[0], Cancelled)
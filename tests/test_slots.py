@@ -0,0 +1,84 @@
+import glob
+import hashlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data import ArrayVar, ExecOptions
+from symantic import parse_program, execute_program, Operations
+from synth import synth_regex
+from utils import read_source
+
+
+PROGRAMS = [os.path.join(ROOT, 'prog.txt')] + sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt')))
+
+# Области видимости переменных циклов, необъявленные имена и листы true/false
+CASES = {
+    'scope_reuse': 'prog S; int s; int c[6]; main() { for (int i = 0; i < 3; i = i + 1) { s = s + i; } for (int i = 5; i >= 3; i = i - 1) { c[i] = s * i; } }',
+    'nested': 'prog S; int s; int m[16]; main() { for (int i = 0; i < 4; i = i + 1) { for (int j = 0; j < 4; j = j + 1) { m[i * 4 + j] = i - j; s = s + m[i * 4 + j]; } } }',
+    'outer_loop_var': 'prog S; int i; int s; main() { for (i = 0; i < 5; i = i + 2) { s = s + i; } s = s + i; }',
+    'bool_leaves': 'prog S; int a; bool b; bool t; main() { t = true; a = true + 2; b = t && !false; b = a > 2 || t; }',
+    'bool_logic': 'prog S; int a; bool b; bool t; main() { t = true; a = 3; b = t && !false; b = a > 2 || t; }',
+    'index_trees': 'prog S; int a[5]; int b[5]; main() { for (int i = 0; i < 5; i = i + 1) { b[i] = 4 - i; a[b[i]] = b[4 - i] * 2; } }',
+    'undeclared_read': 'prog S; int a; main() { a = 1; for (int i = 0; i < 2; i = i + 1) { a = a + q; } }',
+    'undeclared_target': 'prog S; int a; main() { a = 1; q = a; }',
+    'shadowing_loop_var': 'prog S; int a; main() { a = 1; for (int a = 0; a < 2; a = a + 1) { } }',
+    'loop_var_after_scope': 'prog S; int s; main() { for (int i = 0; i < 2; i = i + 1) { s = s + i; } s = i; }',
+    'index_out_of_range': 'prog S; int c[3]; main() { for (int i = 0; i < 5; i = i + 1) { c[i] = i; } }',
+    'division_by_zero': 'prog S; float f; int n; main() { for (int i = 2; i >= 0; i = i - 1) { f = f + 1 / i; } }',
+}
+
+# Трасса (дайджест) или ошибка при поиске переменных по имени - до разрешения слотов (resolve_slots)
+GOLDEN = {
+    'scope_reuse': 'f22424d8499793c9',
+    'nested': '175e31b79a8d5a96',
+    'outer_loop_var': '2dcf7ace81848f3a',
+    'bool_leaves': "ERR Undeclared variable: '0'",
+    'bool_logic': '351b50b442a2bf2d',
+    'index_trees': 'd19968b75fa15e40',
+    'undeclared_read': "ERR Undeclared variable: 'q'",
+    'undeclared_target': "ERR Undeclared variable: 'q'",
+    'shadowing_loop_var': "ERR Variable 'a' already declared",
+    'loop_var_after_scope': "ERR Undeclared variable: 'i'",
+    'index_out_of_range': 'ERR Array index 3 out of range [0, 3)',
+    'division_by_zero': 'ERR Division by zero',
+    'prog.txt': '5a9f81f0536414d2',
+    'program.txt': '2297db37fe37e431',
+    'test.txt': '8c8381f1a8b1d1f3',
+    'test_program_correct.txt': '57d0e2e25ca60e72',
+}
+
+SOURCES = {**CASES, **{os.path.basename(path): read_source(path) for path in PROGRAMS}}
+
+
+def trace_digest(operations) -> str:
+    digest = hashlib.sha256()
+    for var in operations:
+        value = var.get_values() if isinstance(var, ArrayVar) else var.value
+        digest.update(f'{var.name}\0{var.type}\0{value!r}\n'.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def run(source: str, options: ExecOptions = None) -> str:
+    """Дайджест трассы или 'ERR текст ошибки'"""
+    try:
+        program = parse_program(synth_regex(source))
+        return trace_digest(execute_program(program, Operations, options))
+    except Exception as e:
+        return f'ERR {e}'
+
+
+@pytest.mark.parametrize('name', GOLDEN)
+def test_slots_match_name_lookup(name):
+    assert run(SOURCES[name]) == GOLDEN[name]
+
+
+def test_every_name_gets_one_slot():
+    program = parse_program(synth_regex(CASES['scope_reuse']))
+    assert program.slots == ['s', 'c', 'i']
+    first, second = program.body
+    assert first.slot == second.slot == 2
@@ -0,0 +1,75 @@
+import glob
+import os
+import sys
+from functools import partial
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import SUITE, generate_program
+from data import ArrayVar, ExecOptions
+from operations import *
+from symantic import parse_program, execute_program
+from synth import synth_regex
+from utils import read_source
+
+
+PROGRAMS = [os.path.join(ROOT, 'prog.txt')] + sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt')))
+
+SOURCES = (
+    [read_source(path) for path in PROGRAMS]
+    + [generate_program(seed=4, **dict(params, iterations=12, array_size=12)) for params in SUITE.values()]
+    + ['prog E; int a; int c[4]; main() { for (int i = 0; i < 10; i = i + 1) { a = a + i * 2; c[i] = a - 1; } }']
+)
+
+STORAGES = {
+    # Малый буфер: трасса большинства программ сбрасывается на диск несколькими порциями
+    'spill': partial(SpillOperations, max_in_memory=7),
+    'columnar': ColumnarOperations,
+}
+
+
+def record(var) -> tuple:
+    if isinstance(var, ArrayVar):
+        return var.name, var.type, var.get_values()
+    return var.name, var.type, var.value
+
+
+def run(source: str, operations_factory, compiled: bool):
+    """Трасса кортежами (имя, тип, значение) или текст ошибки"""
+    program = parse_program(synth_regex(source))
+    try:
+        operations = execute_program(program, operations_factory, ExecOptions(compiled=compiled))
+    except Exception as e:
+        return str(e)
+    return [record(var) for var in operations]
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+@pytest.mark.parametrize('storage', STORAGES)
+@pytest.mark.parametrize('source', SOURCES, ids=range(len(SOURCES)))
+def test_storage_reproduces_list_trace(source, storage, compiled):
+    expected = run(source, Operations, compiled)
+    trace = run(source, STORAGES[storage], compiled)
+    assert trace == expected
+
+
+def test_spill_file_is_removed_on_close():
+    program = parse_program(synth_regex(read_source(PROGRAMS[0])))
+    operations = execute_program(program, partial(SpillOperations, max_in_memory=7))
+    assert operations._spilled and os.path.exists(operations.path)
+    assert len(list(operations)) == len(operations)
+    operations.close()
+    assert not os.path.exists(operations.path)
+
+
+def test_columnar_indexing_matches_iteration():
+    program = parse_program(synth_regex(SOURCES[len(PROGRAMS)]))
+    operations = execute_program(program, ColumnarOperations)
+    trace = [record(var) for var in operations]
+    assert [record(operations[pos]) for pos in range(len(operations))] == trace
+    assert record(operations[-1]) == trace[-1]
+    with pytest.raises(IndexError):
+        operations[len(operations)]
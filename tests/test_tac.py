@@ -0,0 +1,111 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import SUITE, generate_program
+from data import ArrayVar
+from pipeline import translate
+from symantic import parse_program, execute_program, Operations
+from synth import synth_regex
+from tac import generate_tac, run_tac
+from utils import read_source
+
+
+PROGRAMS = [os.path.join(ROOT, 'prog.txt')] + sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt')))
+
+# Чтение неинициализированной переменной: арифметическое присваивает ей 0, логическое - нет
+UNINITIALIZED = [
+    'prog U; int a; int b; main() { b = a + 1; }',
+    'prog U; int a; int b; main() { b = a; }',
+    'prog U; bool p; bool q; main() { q = p; }',
+    'prog U; bool p; bool q; bool r; main() { r = p && q; q = p || true; }',
+    'prog U; int a; int b; bool p; main() { p = a < b; }',
+    'prog U; int a; int arr[4]; main() { arr[a] = a; }',
+    'prog U; bool p; int i; main() { for (i = 0; p; i = i + 1) { } }',
+]
+
+# Необъявленные имена и перекрытие переменной цикла в коде, до которого выполнение не доходит
+UNREACHED = [
+    'prog D; int a; main() { for (int i = 0; i < 0; i = i + 1) { b = a + c; a = d[i]; } a = 5; }',
+    'prog D; int i; int s; main() { for (int k = 0; k < 0; k = k + 1) { for (int i = 0; i < 2; i = i + 1) { s = s + i; } } s = 3; }',
+    'prog D; bool p; int n; main() { n = 2; for (int k = n; k < 1; k = k + 1) { p = q && p; for (j = 0; j < 1; j = j + 1) { } } }',
+]
+
+# Те же ошибки при выполнении: виртуальная машина бросает их с сообщением интерпретатора
+RUNTIME_ERRORS = [
+    'prog E; int a; main() { a = 1; a = b + 1; }',
+    'prog E; int a; main() { for (int i = 0; i < 2; i = i + 1) { c = a; } }',
+    'prog E; bool p; main() { p = q || p; }',
+    'prog E; int i; main() { for (int i = 0; i < 2; i = i + 1) { } }',
+    'prog E; int a; main() { for (k = 0; k < 2; k = k + 1) { } }',
+    'prog E; int a; int b[3]; main() { a = b + 1; }',
+    'prog E; int a; main() { a = a[1]; }',
+]
+
+
+def final_values(variables) -> dict:
+    return {
+        var.name: var.get_values() if isinstance(var, ArrayVar) else var.value
+        for var in variables
+    }
+
+
+def interpreter_values(source: str) -> dict:
+    program = parse_program(synth_regex(source))
+    operations = execute_program(program, Operations)
+    # Начальные записи трассы - объявленные переменные с итоговыми значениями
+    return final_values(list(operations)[:len(program.declarations)])
+
+
+def vm_values(source: str) -> dict:
+    return final_values(run_tac(generate_tac(parse_program(synth_regex(source)))).values())
+
+
+SOURCES = (
+    [read_source(path) for path in PROGRAMS]
+    + [generate_program(seed=1, **dict(params, iterations=20, array_size=20)) for params in SUITE.values()]
+    + UNINITIALIZED
+    + UNREACHED
+)
+
+
+@pytest.mark.parametrize('source', SOURCES, ids=range(len(SOURCES)))
+def test_vm_matches_interpreter(source):
+    assert vm_values(source) == interpreter_values(source)
+
+
+@pytest.mark.parametrize('source', RUNTIME_ERRORS, ids=range(len(RUNTIME_ERRORS)))
+def test_vm_raises_interpreter_errors(source):
+    with pytest.raises(Exception) as interpreter_error:
+        interpreter_values(source)
+    with pytest.raises(Exception) as vm_error:
+        vm_values(source)
+    assert str(vm_error.value) == str(interpreter_error.value)
+
+
+@pytest.mark.parametrize('source', UNREACHED, ids=range(len(UNREACHED)))
+def test_translate_with_tac_accepts_unreached_errors(source):
+    result = translate(source, tac=True)
+    assert 'error "' in result['tac']
+
+
+def test_vm_reruns_from_declarations():
+    code = generate_tac(parse_program(synth_regex(read_source(PROGRAMS[0]))))
+    assert final_values(run_tac(code).values()) == final_values(run_tac(code).values())
+
+
+def test_listing_size_does_not_depend_on_iterations():
+    source = 'prog L; int s; main() { for (int i = 0; i < {n}; i = i + 1) { s = s + i; } }'
+    short = translate(source.replace('{n}', '10'), tac=True)
+    long = translate(source.replace('{n}', '1000'), tac=True)
+    assert len(short['tac'].splitlines()) == len(long['tac'].splitlines())
+    assert long['operations_count'] > short['operations_count']
+
+
+def test_translate_without_tac():
+    assert translate(read_source(PROGRAMS[0]))['tac'] is None
@@ -0,0 +1,101 @@
+import glob
+import os
+import sys
+from functools import partial
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import SUITE, generate_program
+from data import ArrayVar, ExecOptions
+from operations import *
+from symantic import parse_program, execute_program
+from synth import synth_regex
+from utils import read_source
+
+
+PROGRAMS = [os.path.join(ROOT, 'prog.txt')] + sorted(glob.glob(os.path.join(ROOT, 'tests', '*.txt')))
+
+ERRORS = [
+    'prog E; int a; int b; int c[4]; main() { for (int i = 0; i < 10; i = i + 1) { a = a + i * 2; c[i] = a - 1; } }',
+    'prog E; int a; float f; main() { for (int i = 3; i >= 0; i = i - 1) { f = f + (a + 1) / i; } }',
+]
+
+SOURCES = (
+    [read_source(path) for path in PROGRAMS]
+    + [generate_program(seed=2, **dict(params, iterations=12, array_size=12)) for params in SUITE.values()]
+    + ERRORS
+)
+
+STORAGES = {
+    'list': Operations,
+    'columnar': ColumnarOperations,
+    'spill': partial(SpillOperations, max_in_memory=50),
+}
+
+
+def is_temp(name) -> bool:
+    return isinstance(name, str) and name.startswith('$')
+
+
+def run(source: str, operations_factory, compiled: bool):
+    """(трасса списком, итоговые значения) или текст ошибки"""
+    program = parse_program(synth_regex(source))
+    try:
+        operations = execute_program(program, operations_factory, ExecOptions(compiled=compiled))
+    except Exception as e:
+        return str(e)
+    trace = list(operations)
+    values = {
+        var.name: var.get_values() if isinstance(var, ArrayVar) else var.value
+        for var in trace[:len(program.declarations)]
+    }
+    return trace, values
+
+
+def check_renaming(original: list, renamed: list):
+    """Каждая ссылка на $N переименованной трассы ведет к той же записи, что в исходной"""
+    assert len(renamed) == len(original)
+    current = {}    # переиспользуемое имя -> исходное имя его текущего значения
+    for source, target in zip(original, renamed):
+        if isinstance(source, ArrayVar):
+            continue
+        assert (target.type, is_temp(target.name)) == (source.type, is_temp(source.name))
+        if isinstance(source.value, str):
+            parts = [current[part] if is_temp(part) else part for part in target.value.split(' ')]
+            assert ' '.join(parts) == source.value
+        else:
+            assert target.value == source.value
+        if is_temp(target.name):
+            current[target.name] = source.name
+        else:
+            assert target.name == source.name
+
+
+@pytest.mark.parametrize('compiled', [False, True])
+@pytest.mark.parametrize('storage', STORAGES)
+@pytest.mark.parametrize('source', SOURCES, ids=range(len(SOURCES)))
+def test_reuse_preserves_trace(source, storage, compiled):
+    factory = STORAGES[storage]
+    plain = run(source, factory, compiled)
+    reused = run(source, reusing_temps(factory), compiled)
+    if isinstance(plain, str):
+        assert reused == plain
+        return
+    (original, values), (renamed, reused_values) = plain, reused
+    assert reused_values == values
+    check_renaming(original, renamed)
+    assert len({var.name for var in renamed if is_temp(var.name)}) <= len({var.name for var in original if is_temp(var.name)})
+
+
+def test_reuse_keeps_peak_live_temporaries():
+    source = generate_program(seed=1, nesting=2, iterations=50, array_size=50)
+    trace, _ = run(source, reusing_temps(Operations), False)
+    assert len({var.name for var in trace if is_temp(var.name)}) < 10
+    assert len(trace) > 10_000
+
+
+def test_null_trace_is_unchanged():
+    assert reusing_temps(NullOperations) is NullOperations
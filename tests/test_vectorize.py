@@ -0,0 +1,89 @@
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import vectorize
+from data import ArrayVar
+from symantic import parse_program, execute_program, Operations, NullOperations
+from synth import synth_regex
+
+pytestmark = pytest.mark.skipif(vectorize.np is None, reason='NumPy не установлен')
+
+
+def final_values(operations, program) -> dict:
+    return {
+        var.name: var.get_values() if isinstance(var, ArrayVar) else var.value
+        for var in list(operations)[:len(program.declarations)]
+    }
+
+
+def run(source: str, operations_factory):
+    """(итоговые значения, число операций) или текст ошибки"""
+    program = parse_program(synth_regex(source))
+    try:
+        operations = execute_program(program, operations_factory)
+    except Exception as e:
+        return str(e)
+    return final_values(operations, program), len(operations)
+
+
+def generate_loop(rng: random.Random) -> str:
+    """Случайный счетный цикл над массивами и накоплениями (кандидат на векторное выполнение)"""
+    size = rng.randint(40, 120)
+    offset = rng.randint(0, 3)
+
+    def operand(depth: int) -> str:
+        if depth <= 0 or rng.random() < 0.35:
+            return rng.choice(['i', 'k', str(rng.randint(0, 9)), f'a[i + {offset}]', 'b[i]'])
+        op = rng.choice(['+', '-', '*', '/'])
+        right = operand(0) if op != '/' else rng.choice(['2', 'k', '4'])
+        return f'({operand(depth - 1)} {op} {right})'
+
+    body = [
+        f'a[i + {offset}] = {operand(2)};',
+        f'f[i] = {operand(2)};',
+        f's = s + {operand(1)};',
+        f'x = x - {operand(1)};',
+    ]
+    rng.shuffle(body)
+    body = body[:rng.randint(1, len(body))]
+    start = rng.randint(0, 3)
+    if rng.random() < 0.5:
+        header = f'int i = {start}; i < {rng.randint(35, size - offset)}; i = i + {rng.randint(1, 2)}'
+    else:
+        header = f'int i = {size - 1 - offset}; i >= {start}; i = i - 1'
+    init = ' '.join(f'b[{index}] = {index} * 3 - 7;' for index in range(0, size, 5))
+    return (
+        f'prog V; int a[{size}]; int b[{size}]; float f[{size}]; int s; float x; int k; '
+        f'main() {{ k = {rng.randint(1, 5)}; s = 1; x = 0.5; {init} '
+        f'for ({header}) {{ {" ".join(body)} }} }}'
+    )
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_vectorized_matches_interpreter(seed):
+    source = generate_loop(random.Random(seed))
+    assert run(source, NullOperations) == run(source, Operations)
+
+
+def test_vectorized_path_taken(monkeypatch):
+    vectorized = []
+    original = vectorize.run_vectorized
+
+    def spy(loop, variables, operations):
+        result = original(loop, variables, operations)
+        vectorized.append(result)
+        return result
+    monkeypatch.setattr('symantic.run_vectorized', spy)
+
+    source = (
+        'prog V; int a[2000]; int s; main() { s = 0; '
+        'for (int i = 0; i < 2000; i = i + 1) { a[i] = i * 2 + 1; s = s + a[i] * 3; } }'
+    )
+    assert run(source, NullOperations) == run(source, Operations)
+    assert vectorized == [True]
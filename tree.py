@@ -1,4 +1,3 @@
-from copy import deepcopy
 from data import *
 
 
@@ -7,9 +6,15 @@ class Node:
     def __init__(self, token: Token, left=None, right=None):
         self.token = token
         self.indexes = []  # Для индексов массивов
+        self.slot = None   # Слот переменной в Environment (resolve_slots)
+        self.code = None   # Замыкание корня выражения (closures.compile_program)
         self.left = left
         self.right = right
 
+    def __getstate__(self):
+        # Замыкания не сериализуются (кэш, передача в процессы)
+        return {**self.__dict__, 'code': None}
+
     def __repr__(self):
         if self.left and self.right:
             return f"({self.left} {self.token} {self.right})"
@@ -134,14 +139,14 @@ def build_expression_tree(lst: list[Token], pos: int, terminators: list[str] = N
     return values[0], pos
 
 
-def evaluate(tree: Node, variables: dict[str, SimpleVar | ArrayVar], var_type: str,
+def evaluate(tree: Node, variables: Environment, var_type: str,
              operations: list[SimpleVar | ArrayVar]) -> tuple[float | int, SimpleVar | ArrayVar]:
     """
     Вычисляет значение арифметического выражения, представленного деревом
     
     Args:
         tree: корень дерева выражения
-        variables: таблица символов
+        variables: таблица переменных (листы берут переменную по tree.slot)
         var_type: ожидаемый тип результата
         operations: список операций для промежуточного кода
         
@@ -173,13 +178,21 @@ def evaluate(tree: Node, variables: dict[str, SimpleVar | ArrayVar], var_type: s
             operations.append(var)
             return value_ass, var
         
+        # Константа, вычисленная при свертке (optimize.fold_constants)
+        if token.name == 'const':
+            var = SimpleVar(
+                name=f'${operations.last_index}',
+                type=var_type,
+                value=value,
+            )
+            operations.append(var)
+            return value, var
+        
         # Переменная или массив
-        var_ass = variables.get(value)
-        if not var_ass:
+        var_ass = variables.slots[tree.slot]
+        if var_ass is None:
             raise Exception(f'Undeclared variable: \'{value}\'')
         
-        var = deepcopy(var_ass)
-        
         # Обработка массива с индексами
         if isinstance(var_ass, ArrayVar):
             if not tree.indexes:
@@ -213,6 +226,8 @@ def evaluate(tree: Node, variables: dict[str, SimpleVar | ArrayVar], var_type: s
             if tree.indexes:
                 raise Exception(f'Variable \'{value}\' is not an array')
             
+            # Снимок значения до подстановки 0 вместо None
+            var = var_ass.snapshot()
             value_ass = var_ass.value
             if value_ass is None:
                 # Разрешаем использование неинициализированных переменных (значение = 0)
@@ -1,5 +1,10 @@
+import codecs
 import os.path
 import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
  
 # Чтение файла
@@ -18,6 +23,44 @@ def read_file(filename):
     return program_text
 
 
+# Кодировки текста программы по порядку; latin-1 декодирует любой файл
+SOURCE_ENCODINGS = ('utf-8', 'cp1251', 'latin-1')
+
+
+# Чтение текста программы: utf-8, при ошибке декодирования - cp1251, затем latin-1
+def read_source(path):
+    for encoding in SOURCE_ENCODINGS[:-1]:
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return f.read()
+        except UnicodeDecodeError:
+            pass
+    with open(path, 'r', encoding=SOURCE_ENCODINGS[-1]) as f:
+        return f.read()
+
+
+# Кодировка, в которой read_source прочитает файл; файл проверяется потоком, блоками по chunk_size байт
+def source_encoding(path, chunk_size=1 << 16):
+    for encoding in SOURCE_ENCODINGS[:-1]:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, 'rb') as f:
+                while chunk := f.read(chunk_size):
+                    decoder.decode(chunk)
+                decoder.decode(b'', final=True)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    return SOURCE_ENCODINGS[-1]
+
+
+# Текст программы блоками по chunk_size символов (как read_source, но без чтения файла целиком)
+def source_chunks(path, chunk_size=1 << 16, encoding=None):
+    with open(path, 'r', encoding=encoding or source_encoding(path)) as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
 # Бинарный поиск по словам
 def binary_find(lst, word):
     l, r = 0, len(lst)
@@ -30,3 +73,127 @@ def binary_find(lst, word):
         else:
             r = mid - 1
     return False
+
+
+# Замер времени фазы: реальное (wall) и процессорное (cpu) время в секундах
+@contextmanager
+def timed(timings, phase):
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        timings[phase] = {
+            'wall': time.perf_counter() - wall,
+            'cpu': time.process_time() - cpu,
+        }
+
+
+# Трансляция остановлена через Progress.cancel
+class Cancelled(Exception):
+    pass
+
+
+class Progress:
+    """
+    Ход трансляции и кооперативная отмена
+
+    Трансляция сообщает о начале фаз (phase) и об итерациях циклов (tick);
+    callback(event) получает словарь с фазой и счетчиками, об итерациях - не чаще
+    раза в interval секунд. cancel() можно вызвать из другого потока: трансляция
+    бросит Cancelled на ближайшей проверке (между фазами или через check_every итераций).
+    """
+    def __init__(self, callback, interval: float = 0.1, check_every: int = 1000):
+        self.callback = callback
+        self.interval = interval
+        self.check_every = check_every
+        self.countdown = check_every
+        self.last_report = 0.0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise Cancelled('Трансляция отменена')
+
+    def phase(self, name: str, **counters):
+        self.check()
+        self.last_report = time.monotonic()
+        self.callback({'phase': name, **counters})
+
+    def tick(self, loop_var, operations, count: int = 1):
+        """count итераций цикла по переменной loop_var; operations - трасса (ее длина в отчете)"""
+        self.countdown -= count
+        if self.countdown > 0:
+            return
+        self.countdown = self.check_every
+        self.check()
+        now = time.monotonic()
+        if now - self.last_report >= self.interval:
+            self.last_report = now
+            self.callback({
+                'phase': 'execution',
+                'operations': len(operations),
+                'loop': loop_var.name,
+                'iteration': loop_var.value,
+            })
+
+
+class LogSink:
+    """
+    Буферизованный вывод сообщений
+
+    write() только кладет сообщение в буфер; flush() не чаще раза в interval
+    секунд передает накопленные строки одним вызовом append(text). Последние
+    max_lines строк хранятся в кольцевом буфере: если вывод умеет заменять
+    текст целиком (replace), при переполнении он заменяется этими строками,
+    так что стоимость сброса не зависит от длины всего журнала.
+    """
+    def __init__(self, append, replace=None, max_lines: int = 1000, interval: float = 0.1):
+        self.append = append
+        self.replace = replace
+        self.interval = interval
+        self.lines = deque(maxlen=max_lines)
+        self.shown = 0          # строк в выводе после последней замены
+        self.pending = []
+        self.last_flush = 0.0
+        self.lock = threading.Lock()
+
+    def write(self, message: str):
+        with self.lock:
+            self.pending.extend(str(message).split('\n'))
+
+    def flush(self, force: bool = False):
+        now = time.monotonic()
+        with self.lock:
+            if not self.pending or (not force and now - self.last_flush < self.interval):
+                return
+            batch, self.pending = self.pending, []
+        self.last_flush = now
+        self.lines.extend(batch)
+
+        if self.replace is not None and self.shown + len(batch) > self.lines.maxlen:
+            self.replace('\n'.join(self.lines))
+            self.shown = len(self.lines)
+        else:
+            self.append(('\n' if self.shown else '') + '\n'.join(batch))
+            self.shown += len(batch)
+
+    def clear(self):
+        with self.lock:
+            self.pending = []
+        self.lines.clear()
+        self.shown = 0
+        if self.replace is not None:
+            self.replace('')
+
+
+def stream_sink(stream=None, **kwargs) -> LogSink:
+    """Журнал в поток (по умолчанию sys.stderr) или открытый файл; каждый сброс заканчивается переводом строки"""
+    stream = stream or sys.stderr
+
+    def append(text: str):
+        stream.write(text.lstrip('\n') + '\n')
+        stream.flush()
+    return LogSink(append, **kwargs)
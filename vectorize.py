@@ -0,0 +1,514 @@
+try:
+    import numpy as np
+except ImportError:
+    # NumPy необязателен: без него все циклы выполняет интерпретатор
+    np = None
+
+from data import *
+
+
+# ============================================================================
+# ВЕКТОРНОЕ ВЫПОЛНЕНИЕ СЧЕТНЫХ ЦИКЛОВ
+# ============================================================================
+
+# При меньшем числе итераций цикл дешевле выполнить интерпретатором
+VECTORIZE_MIN_ITERATIONS = 32
+
+# Предел числа итераций счетного цикла (размер векторов в памяти)
+MAX_ITERATIONS = 50_000_000
+
+# Целые значения держатся в пределах точного представления float64:
+# тогда int64 не переполняется, а деление совпадает с делением int в Python
+EXACT_INT = 1 << 53
+
+# Сравнения в условии цикла и они же с переставленными операндами
+RELATIONS = {
+    1: (lambda left, right: left < right, 3),   # <
+    2: (lambda left, right: left <= right, 4),  # <=
+    3: (lambda left, right: left > right, 1),   # >
+    4: (lambda left, right: left >= right, 2),  # >=
+}
+
+
+class LoopNotSupported(Exception):
+    """Цикл (или данный его запуск) нельзя выполнить в обход интерпретатора"""
+
+
+def is_leaf(tree) -> bool:
+    return tree.left is None and tree.right is None
+
+
+def is_var_leaf(tree, name: str) -> bool:
+    return (
+        is_leaf(tree)
+        and tree.token.name == 'id'
+        and tree.token.value == name
+        and not tree.indexes
+    )
+
+
+def const_value(tree, var_type: str):
+    """Значение числовой константы в контексте var_type (как в tree.evaluate)"""
+    if not is_leaf(tree) or tree.token.name not in {'num', 'const'}:
+        raise LoopNotSupported
+    if tree.token.name == 'const':
+        return tree.token.value
+    try:
+        return parse_value(var_type, tree.token.value)[0]
+    except Exception:
+        raise LoopNotSupported
+
+
+def int_const(tree) -> int:
+    value = const_value(tree, 'int')
+    if type(value) is not int:
+        raise LoopNotSupported
+    return value
+
+
+def affine_offset(tree, var_name: str) -> int:
+    """Смещение c для индекса вида i, i + c, c + i, i - c"""
+    if tree is None:
+        raise LoopNotSupported
+    if is_var_leaf(tree, var_name):
+        return 0
+    token = tree.token
+    if token.name == '+' and tree.left is not None and tree.right is not None:
+        if is_var_leaf(tree.left, var_name):
+            offset = int_const(tree.right)
+            return offset if token.value == 1 else -offset
+        if token.value == 1 and is_var_leaf(tree.right, var_name):
+            return int_const(tree.left)
+    raise LoopNotSupported
+
+
+def reduction_terms(tree, name: str) -> list[tuple[int, object]]:
+    """
+    Слагаемые накопления s = s ± t1 ± t2 ... (или s = t + s)
+
+    Returns:
+        [(знак, поддерево), ...] в порядке вычисления
+    """
+    if tree is None:
+        raise LoopNotSupported
+    token = tree.token
+    if (
+        token.name == '+' and token.value == 1
+        and tree.left is not None and tree.right is not None
+        and is_var_leaf(tree.right, name)
+    ):
+        return [(1, tree.left)]
+
+    terms = []
+    node = tree
+    while not is_var_leaf(node, name):
+        if node.token.name != '+' or node.left is None or node.right is None:
+            raise LoopNotSupported
+        terms.append((1 if node.token.value == 1 else -1, node.right))
+        node = node.left
+    if not terms:
+        raise LoopNotSupported
+    terms.reverse()
+    return terms
+
+
+def tree_records(tree) -> int:
+    """Число записей трассы при вычислении дерева (evaluate, evaluate_logic без && и ||)"""
+    if is_leaf(tree):
+        return 1 + sum(tree_records(index) for index in tree.indexes)
+    return tree_records(tree.left) + tree_records(tree.right) + 1
+
+
+def walk_leaves(tree):
+    """Листья дерева, включая листья деревьев индексов"""
+    if tree is None:
+        return
+    if is_leaf(tree):
+        yield tree
+        for index in tree.indexes:
+            yield from walk_leaves(index)
+        return
+    yield from walk_leaves(tree.left)
+    yield from walk_leaves(tree.right)
+
+
+class CountedLoop:
+    """
+    Заголовок счетного цикла: целая переменная i с шагом i = i ± c
+    и условием i <,<=,>,>= E, где E - константа или скаляр
+
+    То, что E не меняется в теле цикла, проверяют наследники при разборе тела.
+    """
+    def __init__(self, loop: ForLoop, variables: Environment):
+        self.loop = loop
+        self.variables = variables
+        self.var_name = loop.var_name
+
+        loop_var = variables.get(loop.var_name)
+        if not isinstance(loop_var, SimpleVar) or loop_var.type != 'int':
+            raise LoopNotSupported
+        self.loop_var = loop_var
+
+        if loop.incr_tree is None or loop.cond_tree is None:
+            raise LoopNotSupported
+        self.step = affine_offset(loop.incr_tree, self.var_name)
+        if self.step == 0:
+            raise LoopNotSupported
+        self.relation, self.bound_tree = self.parse_condition(loop.cond_tree)
+
+    @property
+    def bound_name(self) -> str | None:
+        """Имя скаляра E в условии (None для константы)"""
+        token = self.bound_tree.token
+        return token.value if token.name == 'id' else None
+
+    def parse_condition(self, tree):
+        """Условие i op E: (номер сравнения, дерево E)"""
+        token = tree.token
+        if token.name != 'rel' or token.value not in RELATIONS or is_leaf(tree):
+            raise LoopNotSupported
+        if is_var_leaf(tree.left, self.var_name):
+            relation, bound = token.value, tree.right
+        elif is_var_leaf(tree.right, self.var_name):
+            relation, bound = RELATIONS[token.value][1], tree.left
+        else:
+            raise LoopNotSupported
+
+        if not is_leaf(bound) or bound.indexes:
+            raise LoopNotSupported
+        if bound.token.name == 'id':
+            var = self.variables.get(bound.token.value)
+            if not isinstance(var, SimpleVar) or bound.token.value == self.var_name:
+                raise LoopNotSupported
+        elif bound.token.name not in {'num', 'const'}:
+            raise LoopNotSupported
+        return relation, bound
+
+    def bound_value(self):
+        """Значение E так, как его видит evaluate_logic"""
+        token = self.bound_tree.token
+        if token.name == 'num':
+            return parse_value('float', token.value)[0]
+        if token.name == 'const':
+            return token.value
+        value = self.variables[token.value].value
+        return 0 if value is None else value
+
+    def iteration_count(self, start: int) -> int:
+        """Число итераций, после которых условие впервые ложно"""
+        holds = RELATIONS[self.relation][0]
+        bound = self.bound_value()
+        # Условие должно стать ложным при движении i с шагом step
+        if (self.step > 0) != (self.relation in {1, 2}):
+            raise LoopNotSupported
+        try:
+            count = max(0, int((bound - start) / self.step))
+        except (OverflowError, ValueError, TypeError):
+            raise LoopNotSupported
+        if count > MAX_ITERATIONS:
+            raise LoopNotSupported
+        while count > 0 and not holds(start + (count - 1) * self.step, bound):
+            count -= 1
+        while holds(start + count * self.step, bound):
+            count += 1
+            if count > MAX_ITERATIONS:
+                raise LoopNotSupported
+        return count
+
+
+class VectorLoop(CountedLoop):
+    """
+    Разбор цикла for на векторизуемые части
+
+    Подходит счетный цикл (CountedLoop), у которого:
+    - тело - только присваивания A[i + c] = выражение (каждый массив
+      пишется по одному смещению и читается по нему же) и накопления
+      s = s ± выражение, где s больше нигде в цикле не встречается;
+    - остальные скаляры в теле не меняются.
+    Выражения строятся из констант, i, неизменяемых скаляров и A[i + c].
+    """
+    def __init__(self, loop: ForLoop, variables: Environment):
+        super().__init__(loop, variables)
+
+        self.writes: dict[str, int] = {}        # массив -> смещение записи
+        self.reductions: dict[str, list] = {}   # скаляр -> слагаемые
+        expressions = []                        # (дерево, тип контекста)
+
+        for statement in loop.body:
+            if not isinstance(statement, Assignment) or statement.is_logic:
+                raise LoopNotSupported
+            var = variables.get(statement.name)
+            if isinstance(var, ArrayVar):
+                offset = affine_offset(statement.index_tree, self.var_name)
+                if self.writes.setdefault(statement.name, offset) != offset:
+                    raise LoopNotSupported
+                expressions.append((statement.tree, var.type))
+            elif isinstance(var, SimpleVar):
+                if (
+                    statement.name == self.var_name
+                    or statement.name in self.reductions
+                    or var.type not in {'int', 'float'}
+                ):
+                    raise LoopNotSupported
+                terms = reduction_terms(statement.tree, statement.name)
+                self.reductions[statement.name] = terms
+                expressions += [(term, var.type) for _, term in terms]
+            else:
+                raise LoopNotSupported
+
+        for tree, _ in expressions:
+            self.check_reads(tree)
+        self.expressions = expressions
+        if self.bound_name in self.reductions:
+            raise LoopNotSupported
+
+        # Записи трассы одной итерации интерпретатора: тело, инкремент, проверка условия
+        self.cond_records = tree_records(loop.cond_tree)
+        self.iteration_records = tree_records(loop.incr_tree) + 1 + self.cond_records
+        for statement in loop.body:
+            self.iteration_records += tree_records(statement.tree) + 1
+            if statement.index_tree is not None:
+                self.iteration_records += tree_records(statement.index_tree)
+
+    def check_reads(self, tree):
+        for leaf in walk_leaves(tree):
+            token = leaf.token
+            if token.name in {'num', 'const'}:
+                continue
+            if token.name != 'id':
+                raise LoopNotSupported
+            var = self.variables.get(token.value)
+            if leaf.indexes:
+                if not isinstance(var, ArrayVar) or len(leaf.indexes) != 1:
+                    raise LoopNotSupported
+                offset = affine_offset(leaf.indexes[0], self.var_name)
+                if self.writes.get(token.value, offset) != offset:
+                    raise LoopNotSupported
+            elif token.value != self.var_name:
+                if not isinstance(var, SimpleVar) or token.value in self.reductions:
+                    raise LoopNotSupported
+
+
+# ============================================================================
+# ВЫЧИСЛЕНИЯ НАД ВЕКТОРАМИ
+# ============================================================================
+
+def magnitude(value) -> int | None:
+    """Наибольшее по модулю целое значение (None для нецелых)"""
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind != 'i':
+            return None
+        return int(np.abs(value).max()) if value.size else 0
+    if isinstance(value, int):
+        return abs(value)
+    return None
+
+
+def exact(value):
+    """Проверка, что целые значения точно представимы (см. EXACT_INT)"""
+    size = magnitude(value)
+    if size is not None and size >= EXACT_INT:
+        raise LoopNotSupported
+    return value
+
+
+def as_number(value):
+    """bool участвует в арифметике как int (True + True == 2)"""
+    if isinstance(value, np.ndarray) and value.dtype.kind in 'bu':
+        return value.astype(np.int64)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def page_values(var: ArrayVar, start: int, stop: int):
+    """Элементы [start, stop) массива NumPy (неинициализированные = 0)"""
+    values = var.values
+    dtype = np.dtype(values.typecode)
+    result = np.zeros(stop - start, dtype)
+    for page_index in range(start // PAGE_SIZE, (stop - 1) // PAGE_SIZE + 1):
+        page = values.pages.get(page_index)
+        if page is None:
+            continue
+        if not isinstance(page, array):
+            raise LoopNotSupported  # Значения вне диапазона int64
+        base = page_index * PAGE_SIZE
+        low, high = max(start, base), min(stop, base + len(page))
+        # Неинициализированные элементы страницы хранятся нулями
+        result[low - start:high - start] = np.frombuffer(page, dtype)[low - base:high - base]
+    return result
+
+
+class VectorRun:
+    """Один запуск векторизуемого цикла: вычисление без изменения состояния и фиксация"""
+    def __init__(self, plan: VectorLoop, start: int, count: int):
+        self.plan = plan
+        self.variables = plan.variables
+        self.start = start
+        self.count = count
+        self.step = plan.step
+        self.iv = exact(start + self.step * np.arange(count, dtype=np.int64))
+        self.shadows: dict[str, object] = {}    # записываемый массив -> текущие значения A[i + c]
+        self.reads: dict[tuple[str, int], object] = {}
+
+    def index_range(self, var: ArrayVar, offset: int) -> tuple[int, int]:
+        first = self.start + offset
+        last = self.start + (self.count - 1) * self.step + offset
+        low, high = min(first, last), max(first, last)
+        if low < 0 or high >= var.size:
+            raise LoopNotSupported
+        return low, high
+
+    def read(self, name: str, offset: int):
+        """Вектор значений A[i + c] по итерациям"""
+        if name in self.shadows:
+            return self.shadows[name]
+        key = (name, offset)
+        if key not in self.reads:
+            var = self.variables[name]
+            low, high = self.index_range(var, offset)
+            values = page_values(var, low, high + 1)
+            first = self.start + offset - low
+            values = values[first::self.step]
+            self.reads[key] = exact(as_number(values.astype(np.int64) if values.dtype.kind in 'iu' else values))
+        return self.reads[key]
+
+    def evaluate(self, tree, var_type: str):
+        """Значение выражения: вектор по итерациям или скаляр, если от i не зависит"""
+        token = tree.token
+        if is_leaf(tree):
+            if token.name in {'num', 'const'}:
+                return exact(as_number(const_value(tree, var_type)))
+            if tree.indexes:
+                return self.read(token.value, affine_offset(tree.indexes[0], self.plan.var_name))
+            if token.value == self.plan.var_name:
+                return self.iv
+            value = self.variables[token.value].value
+            if value is None:
+                # Чтение неинициализированной переменной меняет ее значение - оставляем интерпретатору
+                raise LoopNotSupported
+            return exact(as_number(value))
+
+        left = self.evaluate(tree.left, var_type)
+        right = self.evaluate(tree.right, var_type)
+        if token.name == '+' and token.value == 1:
+            return exact(left + right)
+        if token.name == '+' and token.value == 2:
+            return exact(left - right)
+        if token.name == '*' and token.value == 1:
+            left_size, right_size = magnitude(left), magnitude(right)
+            if left_size is not None and right_size is not None and left_size * right_size >= EXACT_INT:
+                raise LoopNotSupported
+            return exact(left * right)
+        if token.name == '*' and token.value == 2:
+            if np.any(right == 0):
+                raise LoopNotSupported
+            return left / right
+        raise LoopNotSupported
+
+    def vector(self, value):
+        if isinstance(value, np.ndarray):
+            return value
+        return np.full(self.count, value)
+
+    def store_values(self, var: ArrayVar, value):
+        """Приведение значений к типу элементов массива, как parse_value"""
+        value = self.vector(value)
+        if var.type == 'float':
+            return value.astype(np.float64)
+        if var.type == 'bool':
+            return value != 0
+        if value.dtype.kind == 'f':
+            if not np.all(np.isfinite(value)) or np.abs(value).max(initial=0) >= EXACT_INT:
+                raise LoopNotSupported
+            value = np.trunc(value).astype(np.int64)
+        limits = np.iinfo(np.dtype(var.values.typecode))
+        if value.size and (value.min() < limits.min or value.max() > limits.max):
+            raise LoopNotSupported
+        return value.astype(np.int64)
+
+    def reduce(self, var: SimpleVar, terms: list):
+        """Итоговое значение накопления с тем же порядком операций, что у интерпретатора"""
+        value = var.value
+        if value is None:
+            raise LoopNotSupported
+        columns = [(sign, self.vector(self.evaluate(term, var.type))) for sign, term in terms]
+        if self.count == 0:
+            return value
+
+        if var.type == 'float':
+            signed = np.column_stack([sign * column.astype(np.float64) for sign, column in columns])
+            return float(np.add.accumulate(np.concatenate(([value], signed.ravel())))[-1])
+
+        if all(column.dtype.kind == 'i' for _, column in columns):
+            size = sum(magnitude(column) for _, column in columns)
+            if (size + 1) * self.count >= EXACT_INT:
+                raise LoopNotSupported
+            return value + sum(sign * int(column.sum()) for sign, column in columns)
+
+        # Целое накопление с дробными слагаемыми: приведение к int на каждой итерации
+        rows = zip(*[column.tolist() for _, column in columns])
+        signs = [sign for sign, _ in columns]
+        try:
+            for row in rows:
+                for sign, term in zip(signs, row):
+                    value = value + term if sign > 0 else value - term
+                value = parse_value('int', value)[0]
+        except (OverflowError, ValueError):
+            raise LoopNotSupported
+        return value
+
+    def run(self):
+        """Вычисление всего цикла, затем запись результата в переменные"""
+        stores = []
+        reductions = {}
+        for statement in self.plan.loop.body:
+            var = self.variables[statement.name]
+            if isinstance(var, ArrayVar):
+                offset = self.plan.writes[statement.name]
+                value = self.store_values(var, self.evaluate(statement.tree, var.type))
+                self.index_range(var, offset)
+                self.shadows[statement.name] = as_number(value)
+                stores.append((var, offset, value))
+            else:
+                reductions[var.name] = self.reduce(var, self.plan.reductions[var.name])
+
+        # Фиксация: дальше ошибок быть не может
+        for var, offset, value in stores:
+            if self.step < 0:
+                value = value[::-1]
+            low, _ = self.index_range(var, offset)
+            if abs(self.step) == 1:
+                var.values.set_slice(low, value.tolist())
+            else:
+                for index, item in zip(range(low, low + abs(self.step) * self.count, abs(self.step)), value.tolist()):
+                    var.values.set(index, item)
+        for name, value in reductions.items():
+            self.variables[name].set_value(value)
+        self.plan.loop_var.set_value(self.start + self.count * self.step)
+
+
+def run_vectorized(loop: ForLoop, variables: Environment, operations) -> bool:
+    """
+    Выполнение цикла for через NumPy (переменная цикла уже инициализирована)
+
+    Трасса operations (без записи, NullOperations) учитывает столько записей,
+    сколько добавил бы интерпретатор: первая проверка условия и count итераций.
+
+    Returns:
+        True, если цикл выполнен; False, если его нужно выполнить
+        интерпретатором (состояние при этом не меняется)
+    """
+    if np is None:
+        return False
+    try:
+        plan = VectorLoop(loop, variables)
+        start = plan.loop_var.value
+        count = plan.iteration_count(start)
+        if count < VECTORIZE_MIN_ITERATIONS:
+            return False
+        VectorRun(plan, start, count).run()
+    except LoopNotSupported:
+        return False
+    operations.skip(plan.cond_records + count * plan.iteration_records)
+    return True